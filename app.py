@@ -1,37 +1,85 @@
+import os
+
 from flask import Flask
 from flask_migrate import Migrate
-from werkzeug.security import generate_password_hash
-from models import db, User, AcademicYear, Semester, YearLevel, Student, Event, EventAttendance, EventAttendanceHistory
-
-# ----------------- 1. Create app -----------------
-app = Flask(__name__)
-app.secret_key = "supersecretkey"
-
-# ----------------- 2. Configure app -----------------
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///dbcs.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# ----------------- 3. Initialize extensions -----------------
-db.init_app(app)
-migrate = Migrate(app, db)
-
-# ----------------- 4. Import routes after app creation -----------------
-from routes import *
-
-# ----------------- 5. Create tables and default admin -----------------
-with app.app_context():
-    db.create_all()
-
-    if not User.query.filter_by(username="admin").first():
-        admin = User(
-            username="admin",
-            password=generate_password_hash("admin123"),
-            role="admin",
-            status="active"
-        )
-        db.session.add(admin)
-        db.session.commit()
-
-# ----------------- 6. Run app -----------------
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.pool import NullPool
+from models import db
+
+migrate = Migrate()
+
+
+# ----------------- Application factory -----------------
+def create_app(config=None):
+    # ----------------- 1. Create app -----------------
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SECRET_KEY", "supersecretkey")
+
+    # ----------------- 2. Configure app -----------------
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL", 'sqlite:///dbcs.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Deleting an academic year or event only tombstones it (undoable) when enabled
+    app.config['SOFT_DELETE'] = os.environ.get("SOFT_DELETE", "0") == "1"
+    # Compiled templates are kept on disk so restarted workers skip the Jinja compile step
+    app.config['JINJA_CACHE_DIR'] = os.environ.get("JINJA_CACHE_DIR", os.path.join(app.instance_path, "jinja_cache"))
+    # Exports and history views read a read-only snapshot refreshed with SQLite's
+    # online backup API once it is older than this many seconds (0 reads the live database)
+    app.config['REPORTING_SNAPSHOT_INTERVAL'] = int(os.environ.get("REPORTING_SNAPSHOT_INTERVAL", 300))
+    # Live attendance streams each hold a worker thread; past this many per process,
+    # pages poll for changes instead (keep it below GUNICORN_THREADS)
+    app.config['LIVE_MAX_STREAMS'] = int(os.environ.get("LIVE_MAX_STREAMS", 8))
+    app.config['SQLALCHEMY_BINDS'] = {
+        # No pool: a refresh renames a new file over the snapshot, and a pooled
+        # connection would keep reading the old one
+        "reporting": {
+            "url": os.environ.get("REPORTING_DATABASE_URL", "sqlite:///file:reporting.db?mode=ro&uri=true"),
+            "poolclass": NullPool,
+        }
+    }
+    if config:
+        app.config.update(config)
+
+    # ----------------- 3. Initialize extensions -----------------
+    db.init_app(app)
+    # render_as_batch: SQLite can only change columns and constraints by rebuilding the table
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations"),
+                     render_as_batch=True)
+    if app.config['JINJA_CACHE_DIR']:
+        os.makedirs(app.config['JINJA_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_CACHE_DIR'])
+
+    # ----------------- 4. Register routes and CLI commands -----------------
+    # Imported here so importing this module stays cheap and touches no database.
+    from routes import bp
+    from reporting import close_reporting_session
+    from commands import (
+        init_db_command, recompute_hours_command, purge_deleted_command,
+        refresh_snapshot_command, archive_year_command
+    )
+    app.register_blueprint(bp)
+    app.teardown_appcontext(close_reporting_session)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(recompute_hours_command)
+    app.cli.add_command(purge_deleted_command)
+    app.cli.add_command(refresh_snapshot_command)
+    app.cli.add_command(archive_year_command)
+
+    return app
+
+
+# ----------------- Template warm-up -----------------
+def warm_templates(app):
+    """Compile every template now rather than on the first request that uses it."""
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        app.jinja_env.get_template(name)
+
+
+# ----------------- Run development server -----------------
 if __name__ == "__main__":
+    from commands import init_db
+
+    app = create_app()
+    with app.app_context():
+        init_db()
+    warm_templates(app)
     app.run(debug=True)
@@ -0,0 +1,274 @@
+"""Move closed academic years out of the live database into per-year files.
+
+``archive_academic_year`` copies a year and every row that hangs off it
+(semesters, year levels, students, events, attendance, history, scans)
+into ``instance/archives/<year>.db`` with ``INSERT ... SELECT`` over an
+ATTACHed database, gzips the file and reads it back. Only then are the
+copied rows deleted from the live database, in one short transaction that
+first checks they have not changed since the copy. Attendance of students
+who have moved on to a later year stays live, along with the events and
+semesters it points at, so their records are unaffected. The
+``AcademicYear`` row stays behind with ``archive_file`` set so the year is
+still listed, read-only.
+``archive_session`` expands the file into a per-process temporary directory
+on first use and opens it read-only; expanded copies unused for
+``ARCHIVE_IDLE_SECONDS`` are deleted, and the directory goes when the
+process exits.
+"""
+import atexit
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from models import (
+    db, User, AcademicYear, Semester, YearLevel, Student,
+    Event, EventAttendance, EventAttendanceHistory, AttendanceScan
+)
+from reporting import sqlite_path
+
+ARCHIVE_IDLE_SECONDS = 600  # drop an expanded archive after this long unused
+
+_expanded = {}              # archive file name -> [expanded path, read-only engine, last used]
+_expand_dir = None          # (pid, directory) for this process's expanded archives
+_lock = threading.Lock()
+
+# Rows belonging to the archived year, keyed by table; ``:ay`` is the year's id.
+_SEMESTERS = "SELECT id FROM semester WHERE academic_year_id = :ay"
+_YEAR_LEVELS = "SELECT id FROM year_level WHERE academic_year_id = :ay"
+_STUDENTS = f"SELECT id FROM student WHERE year_level_id IN ({_YEAR_LEVELS})"
+_EVENTS = f"SELECT id FROM event WHERE semester_id IN ({_SEMESTERS})"
+_ATTENDANCE = f"SELECT id FROM event_attendance WHERE student_id IN ({_STUDENTS})"
+# The year's events that students of other (live) years attended; they stay live
+_KEPT_EVENTS = (
+    f"SELECT event_id FROM event_attendance WHERE event_id IN ({_EVENTS}) AND student_id NOT IN ({_STUDENTS})"
+)
+_KEPT_SEMESTERS = f"SELECT semester_id FROM event WHERE id IN ({_KEPT_EVENTS})"
+
+# (model, rows copied into the archive, rows then deleted from the live database or None)
+_ARCHIVED_ROWS = [
+    (User, f"id IN (SELECT changed_by FROM event_attendance_history WHERE attendance_id IN ({_ATTENDANCE}))",
+     None),
+    (AcademicYear, "id = :ay", None),
+    (Semester, "academic_year_id = :ay", f"academic_year_id = :ay AND id NOT IN ({_KEPT_SEMESTERS})"),
+    (YearLevel, "academic_year_id = :ay", "academic_year_id = :ay"),
+    (Student, f"id IN ({_STUDENTS})", f"id IN ({_STUDENTS})"),
+    (Event, f"id IN ({_EVENTS})", f"id IN ({_EVENTS}) AND id NOT IN ({_KEPT_EVENTS})"),
+    (EventAttendance, f"id IN ({_ATTENDANCE})", f"id IN ({_ATTENDANCE})"),
+    (EventAttendanceHistory, f"attendance_id IN ({_ATTENDANCE})", f"attendance_id IN ({_ATTENDANCE})"),
+    (AttendanceScan, f"student_id IN ({_STUDENTS})", f"student_id IN ({_STUDENTS})"),
+]
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def archive_dir():
+    path = os.path.join(current_app.instance_path, "archives")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _archive_name(ay):
+    return re.sub(r"[^0-9A-Za-z_-]+", "_", ay.year) + ".db"
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout=5000")
+    # Attendance may point at events or students of other years, which stay
+    # live; the archive keeps those ids as plain values, so no FK checks here.
+    conn.execute("PRAGMA foreign_keys=OFF")
+    return conn
+
+
+def _fingerprint(conn, params):
+    """Row counts of everything archived plus the attendance version sum.
+
+    Taken when the rows are copied and again just before they are deleted, so
+    a write that landed in between aborts the archive instead of being lost.
+    """
+    values = [
+        conn.execute(f'SELECT count(*) FROM main."{model.__table__.name}" WHERE {copied}', params).fetchone()[0]
+        for model, copied, _ in _ARCHIVED_ROWS[1:]
+    ]
+    values.append(conn.execute(
+        f"SELECT total(version) FROM main.event_attendance WHERE id IN ({_ATTENDANCE})", params
+    ).fetchone()[0])
+    return values
+
+
+def _copy_year(live_path, path, params):
+    """Copy the year's rows into a new archive file; only the archive is written."""
+    # Create the archive schema from the models, then copy into it set-based
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = _connect(live_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS archive", (path,))
+        # The connect hook put the new file in WAL mode; read-only opens need a plain journal
+        conn.execute("PRAGMA archive.journal_mode=DELETE")
+        conn.execute("BEGIN")
+        try:
+            for model, copied, _ in _ARCHIVED_ROWS:
+                table = model.__table__
+                columns = [column.name for column in table.columns]
+                column_list = ", ".join(f'"{column}"' for column in columns)
+                # Password hashes stay in the live database only
+                selected = ", ".join("''" if column == "password" else f'"{column}"' for column in columns)
+                conn.execute(
+                    f'INSERT INTO archive."{table.name}" ({column_list}) '
+                    f'SELECT {selected} FROM main."{table.name}" WHERE {copied}',
+                    params
+                )
+            # Same read transaction as the copy, so it describes exactly what was copied
+            fingerprint = _fingerprint(conn, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("DETACH DATABASE archive")
+    finally:
+        conn.close()
+    return fingerprint
+
+
+def _compress(path):
+    """Gzip ``path`` to ``path + ".gz"`` and read it back before trusting it."""
+    digest = hashlib.sha256()
+    partial = path + ".gz.partial"
+    try:
+        with open(path, "rb") as src, gzip.open(partial, "wb") as dst:
+            for chunk in iter(lambda: src.read(1 << 20), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+        check = hashlib.sha256()
+        with gzip.open(partial, "rb") as src:
+            for chunk in iter(lambda: src.read(1 << 20), b""):
+                check.update(chunk)
+        if check.digest() != digest.digest():
+            raise ArchiveError("The compressed archive did not read back correctly; nothing was archived.")
+        with open(partial, "rb") as written:
+            os.fsync(written.fileno())
+        os.replace(partial, path + ".gz")
+    except OSError as e:
+        raise ArchiveError(f"Could not write the compressed archive ({e.strerror}); nothing was archived.") from e
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def _delete_archived(live_path, ay, archive_file, fingerprint, params):
+    conn = _connect(live_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if _fingerprint(conn, params) != fingerprint:
+                raise ArchiveError(f"Academic year {ay.year} changed while it was being archived; try again.")
+            # Children first, in reverse of the copy order
+            for model, _, deleted in reversed(_ARCHIVED_ROWS):
+                if deleted is not None:
+                    conn.execute(f'DELETE FROM main."{model.__table__.name}" WHERE {deleted}', params)
+            conn.execute(
+                "UPDATE main.academic_year SET archive_file = :name WHERE id = :ay",
+                {"ay": ay.id, "name": archive_file}
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def archive_academic_year(ay):
+    """Archive a closed academic year; returns the path of the compressed file."""
+    if ay.archive_file:
+        raise ArchiveError(f"Academic year {ay.year} is already archived.")
+    if ay.status == "active":
+        raise ArchiveError("Only inactive academic years can be archived.")
+
+    name = _archive_name(ay)
+    path = os.path.join(archive_dir(), name)
+    if os.path.exists(path + ".gz"):
+        # Different year strings can sanitize to the same name; never overwrite
+        if AcademicYear.query.filter_by(archive_file=name + ".gz").first():
+            raise ArchiveError(f"An archive named {name}.gz already exists; rename the academic year first.")
+        os.remove(path + ".gz")  # written by an archive run that never deleted the live rows
+    if os.path.exists(path):
+        os.remove(path)
+
+    params = {"ay": ay.id}
+    live_path = sqlite_path(db.engine)
+    db.session.commit()  # release the request's read transaction before writing
+    try:
+        fingerprint = _copy_year(live_path, path, params)
+        _compress(path)
+        try:
+            _delete_archived(live_path, ay, name + ".gz", fingerprint, params)
+        except Exception:
+            os.remove(path + ".gz")
+            raise
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    db.session.expire_all()
+    return path + ".gz"
+
+
+def _expansion_dir():
+    # Caller holds _lock
+    global _expand_dir
+    if _expand_dir is None or _expand_dir[0] != os.getpid():
+        directory = tempfile.mkdtemp(prefix="dbcs-archives-")
+        atexit.register(shutil.rmtree, directory, True)
+        _expanded.clear()  # entries inherited from a parent process belong to it
+        _expand_dir = (os.getpid(), directory)
+    return _expand_dir[1]
+
+
+def _drop_expanded(name):
+    # Caller holds _lock
+    entry = _expanded.pop(name, None)
+    if entry is not None:
+        entry[1].dispose()
+        if os.path.exists(entry[0]):
+            os.remove(entry[0])
+
+
+def archive_session(ay):
+    """Open a read-only session on an archived year's file, expanding it if needed."""
+    now = time.monotonic()
+    with _lock:
+        directory = _expansion_dir()
+        for name in [name for name, entry in _expanded.items() if now - entry[2] > ARCHIVE_IDLE_SECONDS]:
+            _drop_expanded(name)
+        entry = _expanded.get(ay.archive_file)
+        if entry is None:
+            path = os.path.join(directory, ay.archive_file[:-len(".gz")])
+            with gzip.open(os.path.join(archive_dir(), ay.archive_file), "rb") as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            engine = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true")
+            entry = _expanded[ay.archive_file] = [path, engine, now]
+        entry[2] = now
+        return Session(bind=entry[1])
+
+
+def remove_archive(archive_file):
+    """Delete an archived year's file (once the year itself has been deleted)."""
+    with _lock:
+        _drop_expanded(archive_file)
+        compressed = os.path.join(archive_dir(), archive_file)
+        if os.path.exists(compressed):
+            os.remove(compressed)
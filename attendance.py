@@ -0,0 +1,306 @@
+import random
+import threading
+import time
+from datetime import datetime
+
+from blinker import Namespace
+from flask import current_app
+from sqlalchemy import and_, case, false, func, insert, literal, or_, select, true, update
+from sqlalchemy.exc import OperationalError
+from models import db, Event, EventAttendance, EventAttendanceHistory, AttendanceScan
+
+SAVE_BATCH_SIZE = 200      # rows per write transaction
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05        # seconds, doubled on every retry
+
+_signals = Namespace()
+
+# SQLite's busy handler polls with growing sleeps, so under contention a waiting
+# writer can keep losing the lock to newer ones. Writers in one process queue
+# here instead and only contend with other processes through the busy handler.
+_write_lock = threading.Lock()
+
+# Sent after attendance writes commit. ``student_ids`` / ``event_ids`` are sets
+# of the affected primary keys, or None when the change is too broad to list.
+# ``rows`` lists the changed attendance rows (see ``attendance_row``) when the
+# writer knows them.
+attendance_changed = _signals.signal("attendance-changed")
+
+
+def attendance_row(attendance_id, event_id, student_id, timed_in, timed_out, hours, version,
+                   was_timed_in, was_timed_out):
+    return {
+        "id": attendance_id,
+        "event_id": event_id,
+        "student_id": student_id,
+        "timed_in": timed_in,
+        "timed_out": timed_out,
+        "hours": hours,
+        "version": version,
+        "was_timed_in": was_timed_in,
+        "was_timed_out": was_timed_out,
+    }
+
+
+def notify_attendance_changed(student_ids=None, event_ids=None, rows=None):
+    if rows is not None:
+        student_ids = {row["student_id"] for row in rows}
+        event_ids = {row["event_id"] for row in rows}
+    attendance_changed.send(
+        current_app._get_current_object(),
+        student_ids=set(student_ids) if student_ids is not None else None,
+        event_ids=set(event_ids) if event_ids is not None else None,
+        rows=rows
+    )
+
+
+def is_lock_error(error):
+    message = str(error.orig).lower()
+    return "locked" in message or "busy" in message
+
+
+def run_with_retry(work):
+    """Run ``work()`` and commit it, retrying with backoff while SQLite is locked."""
+    for attempt in range(LOCK_RETRIES + 1):
+        with _write_lock:
+            try:
+                result = work()
+                db.session.commit()
+                return result
+            except OperationalError as e:
+                db.session.rollback()
+                if attempt == LOCK_RETRIES or not is_lock_error(e):
+                    raise
+            except Exception:
+                db.session.rollback()
+                raise
+        time.sleep(LOCK_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def save_attendance_changes(changes, user_id, reason=None):
+    """Save submitted time-in/time-out states using compare-and-swap on ``version``.
+
+    ``changes`` is a list of ``(attendance_id, version, timed_in, timed_out)``
+    tuples, where ``version`` is the one the form was rendered with. Rows
+    whose state did not change are skipped; rows changed by someone else
+    since the form was rendered are left alone and reported as conflicts.
+    When ``reason`` is given, a history entry is written for every change
+    in hours. Returns ``(saved_count, conflict_ids)``.
+    """
+    saved = 0
+    conflicts = []
+
+    def save_batch(batch):
+        batch_saved = 0
+        batch_conflicts = []
+        history = []
+        touched = []
+        current = {
+            row.id: row for row in db.session.query(
+                EventAttendance.id, EventAttendance.event_id, EventAttendance.student_id,
+                EventAttendance.version,
+                EventAttendance.timed_in, EventAttendance.timed_out,
+                EventAttendance.accumulated_hours, Event.required_hours
+            )
+            .join(Event, EventAttendance.event_id == Event.id)
+            .filter(EventAttendance.id.in_([change[0] for change in batch]))
+        }
+        for attendance_id, version, timed_in, timed_out in batch:
+            row = current.get(attendance_id)
+            if row is None:
+                continue
+            if bool(row.timed_in) == timed_in and bool(row.timed_out) == timed_out:
+                continue
+            if row.version != version:
+                batch_conflicts.append(attendance_id)
+                continue
+
+            new_hours = EventAttendance.hours_for(row.required_hours, timed_in, timed_out)
+            result = db.session.execute(
+                update(EventAttendance)
+                .where(EventAttendance.id == attendance_id, EventAttendance.version == version)
+                .values(
+                    timed_in=timed_in,
+                    timed_out=timed_out,
+                    accumulated_hours=new_hours,
+                    version=EventAttendance.version + 1
+                )
+            )
+            if result.rowcount == 0:
+                batch_conflicts.append(attendance_id)
+                continue
+            batch_saved += 1
+            touched.append(attendance_row(
+                attendance_id, row.event_id, row.student_id, timed_in, timed_out, new_hours,
+                version + 1, bool(row.timed_in), bool(row.timed_out)
+            ))
+
+            if reason and row.accumulated_hours != new_hours:
+                history.append({
+                    "attendance_id": attendance_id,
+                    "old_hours": row.accumulated_hours,
+                    "new_hours": new_hours,
+                    "changed_by": user_id,
+                    "reason": reason,
+                })
+        db.session.bulk_insert_mappings(EventAttendanceHistory, history)
+        return batch_saved, batch_conflicts, touched
+
+    for i in range(0, len(changes), SAVE_BATCH_SIZE):
+        batch = changes[i:i + SAVE_BATCH_SIZE]
+        batch_saved, batch_conflicts, touched = run_with_retry(lambda: save_batch(batch))
+        saved += batch_saved
+        conflicts += batch_conflicts
+        if touched:
+            notify_attendance_changed(rows=touched)
+
+    return saved, conflicts
+
+
+def apply_scans(marks, scan_rows, user_id, reason):
+    """Record scanner uploads and set the flags they mark, in one write transaction.
+
+    ``marks`` maps attendance ids to ``(time_in, time_out)`` booleans saying
+    which flags the scans set. Scans never clear a flag, so they are ORed into
+    the stored values by set-based UPDATEs rather than written back from a
+    read, and a save that commits first is kept. ``scan_rows`` are the
+    ``AttendanceScan`` mappings; an already-applied key raises IntegrityError.
+    Returns the changed rows (see ``attendance_row``).
+    """
+    groups = {}
+    for attendance_id, flags in marks.items():
+        groups.setdefault(flags, []).append(attendance_id)
+
+    def work():
+        # Inserting the scans first takes SQLite's write lock, so the rows read
+        # below are the ones the UPDATEs see.
+        db.session.bulk_insert_mappings(AttendanceScan, scan_rows)
+        before = {}
+        ids = list(marks)
+        for i in range(0, len(ids), SAVE_BATCH_SIZE):
+            before.update(
+                (row.id, row) for row in db.session.query(
+                    EventAttendance.id, EventAttendance.event_id, EventAttendance.student_id,
+                    EventAttendance.version, EventAttendance.timed_in, EventAttendance.timed_out,
+                    EventAttendance.accumulated_hours, Event.required_hours
+                )
+                .join(Event, EventAttendance.event_id == Event.id)
+                .filter(EventAttendance.id.in_(ids[i:i + SAVE_BATCH_SIZE]))
+            )
+
+        for (time_in, time_out), group_ids in groups.items():
+            stored_in = func.coalesce(EventAttendance.timed_in, false())
+            stored_out = func.coalesce(EventAttendance.timed_out, false())
+            new_in = true() if time_in else stored_in
+            new_out = true() if time_out else stored_out
+            unset = or_(*[stored == false() for stored, flag in ((stored_in, time_in), (stored_out, time_out)) if flag])
+            for i in range(0, len(group_ids), SAVE_BATCH_SIZE):
+                db.session.execute(
+                    update(EventAttendance)
+                    .where(EventAttendance.id.in_(group_ids[i:i + SAVE_BATCH_SIZE]), unset)
+                    .values(
+                        timed_in=new_in,
+                        timed_out=new_out,
+                        accumulated_hours=hours_expression(new_in, new_out),
+                        version=EventAttendance.version + 1
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+        changed = []
+        history = []
+        for attendance_id, (time_in, time_out) in marks.items():
+            row = before.get(attendance_id)
+            if row is None:
+                continue
+            timed_in = bool(row.timed_in) or time_in
+            timed_out = bool(row.timed_out) or time_out
+            if (timed_in, timed_out) == (bool(row.timed_in), bool(row.timed_out)):
+                continue
+            new_hours = EventAttendance.hours_for(row.required_hours, timed_in, timed_out)
+            changed.append(attendance_row(
+                attendance_id, row.event_id, row.student_id, timed_in, timed_out, new_hours,
+                row.version + 1, bool(row.timed_in), bool(row.timed_out)
+            ))
+            if row.accumulated_hours != new_hours:
+                history.append({
+                    "attendance_id": attendance_id,
+                    "old_hours": row.accumulated_hours,
+                    "new_hours": new_hours,
+                    "changed_by": user_id,
+                    "reason": reason,
+                })
+        db.session.bulk_insert_mappings(EventAttendanceHistory, history)
+        return changed
+
+    changed = run_with_retry(work)
+    if changed:
+        notify_attendance_changed(rows=changed)
+    return changed
+
+
+def hours_expression(timed_in=None, timed_out=None):
+    """SQL twin of ``EventAttendance.hours_for`` for use in set-based statements.
+
+    The flags default to the stored columns; pass expressions to compute the
+    hours for the values an UPDATE is about to set.
+    """
+    required_hours = (
+        select(Event.required_hours)
+        .where(Event.id == EventAttendance.event_id)
+        .scalar_subquery()
+    )
+    if timed_in is None:
+        timed_in = func.coalesce(EventAttendance.timed_in, false())
+    if timed_out is None:
+        timed_out = func.coalesce(EventAttendance.timed_out, false())
+    return case(
+        (and_(timed_in, timed_out), 0.0),
+        (timed_in != timed_out, required_hours / 2),
+        else_=required_hours
+    )
+
+
+def write_recomputed_hours(user_id=None, event_ids=None, reason="Recomputed after event change"):
+    """Recompute ``accumulated_hours`` for the given events (or all) in one UPDATE.
+
+    Runs in the caller's transaction and leaves committing to it, so an event
+    change and the totals that follow from it land together. A history entry
+    is written for every row whose hours actually change, with one
+    INSERT ... SELECT, unless ``user_id`` is None. Returns the number of rows
+    updated.
+    """
+    new_hours = hours_expression()
+    stale = EventAttendance.accumulated_hours.is_distinct_from(new_hours)
+    if event_ids is not None:
+        stale = and_(stale, EventAttendance.event_id.in_(event_ids))
+
+    if user_id is not None:
+        db.session.execute(
+            insert(EventAttendanceHistory).from_select(
+                ["attendance_id", "old_hours", "new_hours", "changed_by", "changed_at", "reason"],
+                select(
+                    EventAttendance.id,
+                    func.coalesce(EventAttendance.accumulated_hours, 0.0),
+                    new_hours,
+                    literal(user_id),
+                    literal(datetime.utcnow()),
+                    literal(reason)
+                ).where(stale)
+            )
+        )
+    result = db.session.execute(
+        update(EventAttendance)
+        .where(stale)
+        .values(accumulated_hours=new_hours, version=EventAttendance.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def recompute_hours(user_id=None, event_ids=None, reason="Recomputed after event change"):
+    """Commit ``write_recomputed_hours`` with lock retries. Returns the number of rows updated."""
+    updated = run_with_retry(lambda: write_recomputed_hours(user_id, event_ids, reason))
+    if updated:
+        notify_attendance_changed(event_ids=event_ids)
+    return updated
@@ -0,0 +1,93 @@
+import click
+from flask.cli import with_appcontext
+from flask_migrate import upgrade
+from werkzeug.security import generate_password_hash
+from sqlalchemy import delete
+from models import db, User, AcademicYear, Event
+from attendance import recompute_hours
+from reporting import refresh_snapshot
+from archive import ArchiveError, archive_academic_year, remove_archive
+
+
+def init_db():
+    """Bring the schema up to date and create the default admin account."""
+    # Same as `flask db upgrade`: create_all() would skip tables that already
+    # exist and leave their new columns and foreign keys out.
+    upgrade()
+
+    if not User.query.filter_by(username="admin").first():
+        admin = User(
+            username="admin",
+            password=generate_password_hash("admin123"),
+            role="admin",
+            status="active"
+        )
+        db.session.add(admin)
+        db.session.commit()
+
+
+# ----------------- flask init-db -----------------
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Apply migrations and seed the default admin (run once per deploy)."""
+    init_db()
+    click.echo("Database initialized.")
+
+
+# ----------------- flask recompute-hours -----------------
+@click.command("recompute-hours")
+@click.option("--event", "event_ids", type=int, multiple=True, help="Limit to these event IDs (repeatable).")
+@click.option("--user", "username", default="admin", show_default=True, help="User recorded in the change history.")
+@with_appcontext
+def recompute_hours_command(event_ids, username):
+    """Recompute accumulated hours from time-in/time-out and required hours."""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.ClickException(f"Unknown user: {username}")
+    updated = recompute_hours(user.id, list(event_ids) or None, reason="Recomputed via CLI")
+    click.echo(f"Updated {updated} attendance record(s).")
+
+
+# ----------------- flask purge-deleted -----------------
+@click.command("purge-deleted")
+@with_appcontext
+def purge_deleted_command():
+    """Permanently remove soft-deleted academic years and events."""
+    archive_files = [
+        archive_file for (archive_file,) in
+        db.session.query(AcademicYear.archive_file)
+        .filter(AcademicYear.deleted_at.isnot(None), AcademicYear.archive_file.isnot(None))
+    ]
+    events = db.session.execute(delete(Event).where(Event.deleted_at.isnot(None))).rowcount
+    years = db.session.execute(delete(AcademicYear).where(AcademicYear.deleted_at.isnot(None))).rowcount
+    db.session.commit()
+    # Only once the rows are gone, so a failed purge leaves every archive in place
+    for archive_file in archive_files:
+        remove_archive(archive_file)
+    click.echo(f"Purged {years} academic year(s) and {events} event(s).")
+
+
+# ----------------- flask refresh-snapshot -----------------
+@click.command("refresh-snapshot")
+@with_appcontext
+def refresh_snapshot_command():
+    """Copy the live database into the read-only reporting snapshot."""
+    as_of = refresh_snapshot()
+    click.echo(f"Reporting snapshot refreshed ({as_of:%Y-%m-%d %H:%M:%S}).")
+
+
+# ----------------- flask archive-year -----------------
+@click.command("archive-year")
+@click.argument("year")
+@with_appcontext
+def archive_year_command(year):
+    """Move an inactive academic year (e.g. 2023-2024) into its own archive file."""
+    ay = AcademicYear.query.filter_by(year=year).first()
+    if not ay:
+        raise click.ClickException(f"Unknown academic year: {year}")
+    try:
+        path = archive_academic_year(ay)
+    except ArchiveError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Archived {year} to {path}.")
@@ -0,0 +1,18 @@
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+# Live attendance streams hold a connection open for as long as the page is,
+# so each worker serves requests from a thread pool rather than one at a time.
+# At most LIVE_MAX_STREAMS (default 8) of the threads go to streams; further
+# pages poll for changes, so the rest stay free for ordinary requests.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+
+# Load the app once in the master and fork workers from it, so each worker
+# starts without re-importing Flask, SQLAlchemy or the routes. wsgi.py logs
+# how long that took ("App ready in ... ms").
+preload_app = True
+
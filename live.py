@@ -0,0 +1,293 @@
+"""Live per-event attendance, pushed to watchers as server-sent events.
+
+Each watched event keeps its rows' flags, hours and versions in memory. Rows
+saved in this process arrive through the ``attendance_changed`` receiver as
+they commit. Rows saved by other worker processes (and changes signalled
+without row details) are picked up by one cheap poll per event every
+``LIVE_POLL_INTERVAL`` seconds: it compares the event's row count and version
+sum with the ones held here, and only re-reads the rows when they differ.
+Every change is serialized once and written out as-is to every watcher, so a
+hundred open pages cost about the same as one.
+
+An open stream holds a worker thread for as long as the page is open, so a
+process serves at most ``LIVE_MAX_STREAMS`` of them; pages turned away poll
+``changes_since`` instead, which answers from the same feed.
+"""
+import json
+import secrets
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import func
+from models import db, EventAttendance
+from attendance import attendance_changed
+
+LIVE_BACKLOG = 256            # messages kept per event for reconnecting watchers
+LIVE_KEEPALIVE = 15           # seconds between comment lines on an idle stream
+LIVE_POLL_INTERVAL = 2        # seconds between checks for other processes' writes
+LIVE_IDLE_FEED = 30           # seconds a feed outlives its last stream or poll
+
+_feeds = {}                   # event pk -> EventFeed, only while someone is watching
+_feeds_lock = threading.Lock()
+_streams = 0                  # open streams in this process
+
+
+def _row(attendance_id, student_id, timed_in, timed_out, hours, version):
+    return {
+        "id": attendance_id,
+        "student_id": student_id,
+        "timed_in": bool(timed_in),
+        "timed_out": bool(timed_out),
+        "hours": hours,
+        "version": version,
+    }
+
+
+def _read_watermark(event_id):
+    """(row count, version sum) for an event; every saved change bumps a row's version."""
+    return tuple(
+        db.session.query(func.count(EventAttendance.id), func.coalesce(func.sum(EventAttendance.version), 0))
+        .filter(EventAttendance.event_id == event_id)
+        .one()
+    )
+
+
+def _read_rows(event_id):
+    return [
+        _row(*values) for values in
+        db.session.query(
+            EventAttendance.id, EventAttendance.student_id, EventAttendance.timed_in,
+            EventAttendance.timed_out, EventAttendance.accumulated_hours, EventAttendance.version
+        ).filter(EventAttendance.event_id == event_id)
+    ]
+
+
+def _dumps(payload):
+    return json.dumps(payload, separators=(",", ":"))
+
+
+class EventFeed:
+    def __init__(self, event_id, rows):
+        self.event_id = event_id
+        # Cursors carry the feed's epoch, so one handed out by another worker
+        # (or by a feed since dropped) is never mistaken for one of ours
+        self.epoch = secrets.token_hex(4)
+        self.rows = {}            # attendance pk -> row
+        self.counts = {"total": 0, "timed_in": 0, "timed_out": 0}
+        self.version_sum = 0
+        for row in rows:
+            self._merge(row)
+        self.seq = 0
+        self.backlog = deque(maxlen=LIVE_BACKLOG)   # (seq, SSE message, JSON payload)
+        self._snapshot = None
+        self.cond = threading.Condition()
+        self.streams = 0
+        self.used_at = self.synced_at = time.monotonic()
+        self.syncing = False
+
+    def cursor(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def parse_cursor(self, cursor):
+        """The seq in one of this feed's cursors, or None for a missing or foreign one."""
+        epoch, _, seq = (cursor or "").partition("-")
+        return int(seq) if epoch == self.epoch and seq.isdigit() else None
+
+    def _count(self, row, sign):
+        self.counts["timed_in"] += sign * row["timed_in"]
+        self.counts["timed_out"] += sign * row["timed_out"]
+        self.version_sum += sign * row["version"]
+
+    def _merge(self, row):
+        """Keep ``row`` if it is newer than the one held; True if it was."""
+        # Caller holds self.cond
+        old = self.rows.get(row["id"])
+        if old is not None and old["version"] >= row["version"]:
+            return False
+        if old is None:
+            self.counts["total"] += 1
+        else:
+            self._count(old, -1)
+        self._count(row, 1)
+        self.rows[row["id"]] = row
+        return True
+
+    def _publish(self, rows):
+        # Caller holds self.cond
+        self.seq += 1
+        data = _dumps({"rows": rows, "counts": self.counts})
+        self.backlog.append((self.seq, f"id: {self.cursor(self.seq)}\nevent: attendance\ndata: {data}\n\n", data))
+        self.cond.notify_all()
+
+    def snapshot(self):
+        """(seq, JSON payload) with every row and the counts, serialized once per change."""
+        # Caller holds self.cond
+        if self._snapshot is None or self._snapshot[0] != self.seq:
+            self._snapshot = (self.seq, _dumps({"rows": list(self.rows.values()), "counts": self.counts}))
+        return self._snapshot
+
+    def since(self, seq):
+        """Backlog entries after ``seq``, or None if the backlog no longer reaches back that far."""
+        # Caller holds self.cond
+        if seq is None or seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self.backlog or self.backlog[0][0] > seq + 1:
+            return None
+        return [entry for entry in self.backlog if entry[0] > seq]
+
+    def apply(self, rows):
+        with self.cond:
+            changed = [
+                row for row in (
+                    _row(row["id"], row["student_id"], row["timed_in"], row["timed_out"], row["hours"], row["version"])
+                    for row in rows
+                )
+                if self._merge(row)
+            ]
+            if changed:
+                self._publish(changed)
+
+    def mark_stale(self):
+        with self.cond:
+            self.synced_at = 0
+            self.cond.notify_all()
+
+    def claim_sync(self):
+        """True for the one caller that should poll the database now."""
+        # Caller holds self.cond
+        if self.syncing or time.monotonic() - self.synced_at < LIVE_POLL_INTERVAL:
+            return False
+        self.syncing = True
+        return True
+
+    def sync(self):
+        try:
+            with self.cond:
+                held = (len(self.rows), self.version_sum)
+            rows = _read_rows(self.event_id) if _read_watermark(self.event_id) != held else None
+        finally:
+            db.session.close()  # don't hold a pooled connection for the life of the stream
+            with self.cond:
+                self.syncing = False
+                self.synced_at = time.monotonic()
+        if rows is None:
+            return
+        with self.cond:
+            changed = [row for row in rows if self._merge(row)]
+            gone = self.rows.keys() - {row["id"] for row in rows}
+            for attendance_id in gone:
+                self.counts["total"] -= 1
+                self._count(self.rows.pop(attendance_id), -1)
+            if changed or gone:
+                self._publish(changed)
+
+
+def _feed(event_id):
+    # Caller holds _feeds_lock
+    now = time.monotonic()
+    for idle in [feed for feed in _feeds.values() if not feed.streams and now - feed.used_at > LIVE_IDLE_FEED]:
+        del _feeds[idle.event_id]
+    feed = _feeds.get(event_id)
+    if feed is None:
+        try:
+            feed = _feeds[event_id] = EventFeed(event_id, _read_rows(event_id))
+        finally:
+            db.session.close()
+    feed.used_at = now
+    return feed
+
+
+def _close_stream(feed):
+    global _streams
+    with _feeds_lock:
+        _streams -= 1
+        feed.streams -= 1
+        feed.used_at = time.monotonic()
+
+
+def open_stream(event_id, cursor=None, limit=None):
+    """SSE messages for an event until the client disconnects, or None if this
+    process already has ``limit`` streams open.
+
+    ``cursor`` is the client's ``Last-Event-ID``. Iterate the result inside the
+    request's app context (``stream_with_context``).
+    """
+    global _streams
+    with _feeds_lock:
+        if limit is not None and _streams >= limit:
+            return None
+        feed = _feed(event_id)
+        feed.streams += 1
+        _streams += 1
+    stream = _watch(feed, cursor)
+    next(stream)  # enter its try block, so however the response ends the slot is given back
+    return stream
+
+
+def _watch(feed, cursor):
+    try:
+        yield ""
+        seq = feed.parse_cursor(cursor)
+        sent_at = time.monotonic()
+        while True:
+            with feed.cond:
+                entries = feed.since(seq)
+                if entries == []:
+                    feed.cond.wait(LIVE_POLL_INTERVAL)
+                    entries = feed.since(seq)
+                if entries is None:
+                    seq, data = feed.snapshot()
+                    chunk = f"id: {feed.cursor(seq)}\nevent: snapshot\ndata: {data}\n\n"
+                elif entries:
+                    seq = entries[-1][0]
+                    chunk = "".join(message for _, message, _ in entries)
+                else:
+                    chunk = None
+                due = feed.claim_sync()
+            now = time.monotonic()
+            if chunk is None and now - sent_at >= LIVE_KEEPALIVE:
+                chunk = ": keepalive\n\n"
+            if chunk is not None:
+                sent_at = now
+                yield chunk
+            if due:
+                feed.sync()
+    finally:
+        _close_stream(feed)
+
+
+def changes_since(event_id, cursor=None):
+    """JSON text with the changes after ``cursor`` (or a full snapshot) and the next cursor."""
+    with _feeds_lock:
+        feed = _feed(event_id)
+    with feed.cond:
+        due = feed.claim_sync()
+    if due:
+        feed.sync()
+    with feed.cond:
+        seq = feed.parse_cursor(cursor)
+        entries = feed.since(seq)
+        if entries is None:
+            seq, data = feed.snapshot()
+            messages = [data]
+        else:
+            seq = entries[-1][0] if entries else seq
+            messages = [data for _, _, data in entries]
+        return f'{{"cursor":"{feed.cursor(seq)}","messages":[{",".join(messages)}]}}'
+
+
+@attendance_changed.connect
+def _publish_changes(sender, student_ids=None, event_ids=None, rows=None, **extra):
+    with _feeds_lock:
+        if event_ids is None:
+            feeds = list(_feeds.values())
+        else:
+            feeds = [_feeds[event_id] for event_id in event_ids if event_id in _feeds]
+    for feed in feeds:
+        if rows is None:
+            feed.mark_stale()
+        else:
+            feed.apply([row for row in rows if row["event_id"] == feed.event_id])
@@ -0,0 +1,136 @@
+"""Baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19 12:00:00
+
+Databases created by the old ``db.create_all()`` at startup already have
+these tables; they are skipped so ``flask db upgrade`` can adopt them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'user' not in existing:
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=50), nullable=False),
+            sa.Column('password', sa.String(length=255), nullable=False),
+            sa.Column('role', sa.String(length=20), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username')
+        )
+    if 'academic_year' not in existing:
+        op.create_table(
+            'academic_year',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('year', sa.String(length=20), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('year')
+        )
+    if 'semester' not in existing:
+        op.create_table(
+            'semester',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('academic_year_id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=20), nullable=False),
+            sa.Column('start_date', sa.Date(), nullable=True),
+            sa.Column('end_date', sa.Date(), nullable=True),
+            sa.ForeignKeyConstraint(['academic_year_id'], ['academic_year.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'year_level' not in existing:
+        op.create_table(
+            'year_level',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('academic_year_id', sa.Integer(), nullable=False),
+            sa.Column('level', sa.Integer(), nullable=False),
+            sa.Column('section', sa.String(length=5), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['academic_year_id'], ['academic_year.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('academic_year_id', 'level', 'section', name='uq_year_level_section')
+        )
+    if 'student' not in existing:
+        op.create_table(
+            'student',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('student_id', sa.String(length=8), nullable=False),
+            sa.Column('fname', sa.String(length=50), nullable=False),
+            sa.Column('mname', sa.String(length=50), nullable=True),
+            sa.Column('lname', sa.String(length=50), nullable=False),
+            sa.Column('year_level_id', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['year_level_id'], ['year_level.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('student_id')
+        )
+    if 'event' not in existing:
+        op.create_table(
+            'event',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=False),
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('required_hours', sa.Float(), nullable=False),
+            sa.Column('target_years', sa.String(length=255), nullable=False),
+            sa.Column('semester_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['semester_id'], ['semester.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'event_attendance' not in existing:
+        op.create_table(
+            'event_attendance',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('event_id', sa.Integer(), nullable=False),
+            sa.Column('student_id', sa.Integer(), nullable=False),
+            sa.Column('timed_in', sa.Boolean(), nullable=True),
+            sa.Column('timed_out', sa.Boolean(), nullable=True),
+            sa.Column('accumulated_hours', sa.Float(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['event_id'], ['event.id']),
+            sa.ForeignKeyConstraint(['student_id'], ['student.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('event_id', 'student_id', name='uq_event_student')
+        )
+    if 'event_attendance_history' not in existing:
+        op.create_table(
+            'event_attendance_history',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('attendance_id', sa.Integer(), nullable=False),
+            sa.Column('old_hours', sa.Float(), nullable=False),
+            sa.Column('new_hours', sa.Float(), nullable=False),
+            sa.Column('changed_by', sa.Integer(), nullable=False),
+            sa.Column('changed_at', sa.DateTime(), nullable=True),
+            sa.Column('reason', sa.String(length=255), nullable=True),
+            sa.ForeignKeyConstraint(['attendance_id'], ['event_attendance.id']),
+            sa.ForeignKeyConstraint(['changed_by'], ['user.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('event_attendance_history')
+    op.drop_table('event_attendance')
+    op.drop_table('event')
+    op.drop_table('student')
+    op.drop_table('year_level')
+    op.drop_table('semester')
+    op.drop_table('academic_year')
+    op.drop_table('user')
@@ -0,0 +1,45 @@
+"""Add attendance_scan for idempotent scanner uploads
+
+Revision ID: 0002_attendance_scan
+Revises: 0001_baseline
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_attendance_scan'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'attendance_scan',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+        sa.Column('device_id', sa.String(length=64), nullable=True),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('scanned_at', sa.DateTime(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['event.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['student_id'], ['student.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key')
+    )
+    with op.batch_alter_table('attendance_scan', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_attendance_scan_event_id'), ['event_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_attendance_scan_student_id'), ['student_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance_scan', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_attendance_scan_student_id'))
+        batch_op.drop_index(batch_op.f('ix_attendance_scan_event_id'))
+
+    op.drop_table('attendance_scan')
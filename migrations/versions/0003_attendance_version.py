@@ -0,0 +1,27 @@
+"""Add event_attendance.version for compare-and-swap saves
+
+Revision ID: 0003_attendance_version
+Revises: 0002_attendance_scan
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_attendance_version'
+down_revision = '0002_attendance_scan'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows start at version 1, the same as rows inserted by the app
+    with op.batch_alter_table('event_attendance', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('event_attendance', schema=None) as batch_op:
+        batch_op.drop_column('version')
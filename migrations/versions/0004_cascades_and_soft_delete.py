@@ -0,0 +1,80 @@
+"""Cascade deletes in the database, index foreign keys, add soft-delete columns
+
+Revision ID: 0004_cascades_and_soft_delete
+Revises: 0003_attendance_version
+Create Date: 2026-10-19 12:00:00
+
+The baseline foreign keys are unnamed, so the naming convention below gives
+batch mode a name to drop them by while it rebuilds each table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_cascades_and_soft_delete'
+down_revision = '0003_attendance_version'
+branch_labels = None
+depends_on = None
+
+naming_convention = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+# (table, column, referred table, ON DELETE)
+foreign_keys = [
+    ('semester', 'academic_year_id', 'academic_year', 'CASCADE'),
+    ('year_level', 'academic_year_id', 'academic_year', 'CASCADE'),
+    ('student', 'year_level_id', 'year_level', 'CASCADE'),
+    ('event', 'semester_id', 'semester', 'SET NULL'),
+    ('event_attendance', 'event_id', 'event', 'CASCADE'),
+    ('event_attendance', 'student_id', 'student', 'CASCADE'),
+    ('event_attendance_history', 'attendance_id', 'event_attendance', 'CASCADE'),
+]
+
+indexes = [
+    ('student', 'year_level_id'),
+    ('event', 'semester_id'),
+    ('event_attendance', 'student_id'),
+    ('event_attendance_history', 'attendance_id'),
+]
+
+
+def _rebuild_foreign_keys(ondelete_for):
+    tables = []
+    for table, *_ in foreign_keys:
+        if table not in tables:
+            tables.append(table)
+    for table in tables:
+        with op.batch_alter_table(table, schema=None, naming_convention=naming_convention) as batch_op:
+            for fk_table, column, referred, ondelete in foreign_keys:
+                if fk_table != table:
+                    continue
+                batch_op.drop_constraint(f'fk_{table}_{column}_{referred}', type_='foreignkey')
+                batch_op.create_foreign_key(f'fk_{table}_{column}_{referred}', referred, [column], ['id'], ondelete=ondelete_for(ondelete))
+
+
+def upgrade():
+    with op.batch_alter_table('academic_year', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    _rebuild_foreign_keys(lambda ondelete: ondelete)
+
+    for table, column in indexes:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f(f'ix_{table}_{column}'), [column], unique=False)
+
+
+def downgrade():
+    for table, column in indexes:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_{column}'))
+
+    _rebuild_foreign_keys(lambda ondelete: None)
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
+    with op.batch_alter_table('academic_year', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,26 @@
+"""Add academic_year.archive_file for years moved to per-year archives
+
+Revision ID: 0005_academic_year_archive_file
+Revises: 0004_cascades_and_soft_delete
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_academic_year_archive_file'
+down_revision = '0004_cascades_and_soft_delete'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('academic_year', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archive_file', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('academic_year', schema=None) as batch_op:
+        batch_op.drop_column('archive_file')
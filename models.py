@@ -1,8 +1,27 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from datetime import datetime
+import sqlite3
 
 db = SQLAlchemy()
 
+
+# ----------------- SQLite connection setup -----------------
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers in other workers proceed while one worker writes;
+    # busy_timeout makes writers wait for the lock instead of failing at once.
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA foreign_keys=ON")  # needed for ON DELETE CASCADE
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            pass  # read-only connections (the reporting snapshot) keep their journal mode
+        cursor.close()
+
 # ----------------- User -----------------
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -21,14 +40,17 @@ class AcademicYear(db.Model):
     year = db.Column(db.String(20), unique=True, nullable=False)
     status = db.Column(db.String(20), nullable=False, default="active")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    deleted_at = db.Column(db.DateTime, nullable=True)   # set when soft-deleted
+    archive_file = db.Column(db.String(255), nullable=True)  # set once moved to instance/archives
 
-    semesters = db.relationship("Semester", backref="academic_year", cascade="all, delete-orphan")
-    year_levels = db.relationship("YearLevel", backref="academic_year", cascade="all, delete-orphan")
+    # Children are removed by ON DELETE CASCADE in the database, not loaded by the ORM
+    semesters = db.relationship("Semester", backref="academic_year", cascade="all, delete-orphan", passive_deletes=True)
+    year_levels = db.relationship("YearLevel", backref="academic_year", cascade="all, delete-orphan", passive_deletes=True)
 
 # ----------------- Semester -----------------
 class Semester(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    academic_year_id = db.Column(db.Integer, db.ForeignKey("academic_year.id"), nullable=False)
+    academic_year_id = db.Column(db.Integer, db.ForeignKey("academic_year.id", ondelete="CASCADE"), nullable=False)
     name = db.Column(db.String(20), nullable=False)       # e.g., "1st Semester"
     start_date = db.Column(db.Date, nullable=True)
     end_date = db.Column(db.Date, nullable=True)
@@ -36,12 +58,12 @@ class Semester(db.Model):
 # ----------------- YearLevel -----------------
 class YearLevel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    academic_year_id = db.Column(db.Integer, db.ForeignKey("academic_year.id"), nullable=False)
+    academic_year_id = db.Column(db.Integer, db.ForeignKey("academic_year.id", ondelete="CASCADE"), nullable=False)
     level = db.Column(db.Integer, nullable=False)         # 1-4
     section = db.Column(db.String(5), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    students = db.relationship("Student", backref="year_level", cascade="all, delete-orphan")
+    students = db.relationship("Student", backref="year_level", cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = (
         db.UniqueConstraint("academic_year_id", "level", "section", name="uq_year_level_section"),
@@ -57,7 +79,7 @@ class Student(db.Model):
     fname = db.Column(db.String(50), nullable=False)
     mname = db.Column(db.String(50), nullable=True)
     lname = db.Column(db.String(50), nullable=False)
-    year_level_id = db.Column(db.Integer, db.ForeignKey("year_level.id"), nullable=False)
+    year_level_id = db.Column(db.Integer, db.ForeignKey("year_level.id", ondelete="CASCADE"), nullable=False, index=True)
     status = db.Column(db.String(20), nullable=False, default="active")  # active, inactive, graduate
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -68,10 +90,11 @@ class Event(db.Model):
     date = db.Column(db.Date, nullable=False)
     required_hours = db.Column(db.Float, default=2.0, nullable=False)
     target_years = db.Column(db.String(255), nullable=False)   # CSV of YearLevel IDs or "all"
-    semester_id = db.Column(db.Integer, db.ForeignKey("semester.id"), nullable=True)
-    semester = db.relationship("Semester", backref="events")
+    semester_id = db.Column(db.Integer, db.ForeignKey("semester.id", ondelete="SET NULL"), nullable=True, index=True)
+    semester = db.relationship("Semester", backref=db.backref("events", passive_deletes=True))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    attendance = db.relationship("EventAttendance", backref="event", cascade="all, delete-orphan")
+    deleted_at = db.Column(db.DateTime, nullable=True)   # set when soft-deleted
+    attendance = db.relationship("EventAttendance", backref="event", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Event {self.name} ({self.date})>"
@@ -79,41 +102,59 @@ class Event(db.Model):
 # ----------------- EventAttendance -----------------
 class EventAttendance(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    event_id = db.Column(db.Integer, db.ForeignKey("event.id"), nullable=False)
-    student_id = db.Column(db.Integer, db.ForeignKey("student.id"), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id", ondelete="CASCADE"), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey("student.id", ondelete="CASCADE"), nullable=False, index=True)
     timed_in = db.Column(db.Boolean, default=False)
     timed_out = db.Column(db.Boolean, default=False)
     accumulated_hours = db.Column(db.Float, default=0.0)
+    version = db.Column(db.Integer, nullable=False, default=1)   # bumped on every write, for compare-and-swap saves
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    student = db.relationship("Student", backref="event_attendances")
+    student = db.relationship("Student", backref=db.backref("event_attendances", passive_deletes=True))
 
     __table_args__ = (
         db.UniqueConstraint("event_id", "student_id", name="uq_event_student"),
     )
 
-    def calculate_accumulated_hours(self):
-        total_hours = self.event.required_hours
-        if self.timed_in and self.timed_out:
+    @staticmethod
+    def hours_for(total_hours, timed_in, timed_out):
+        if timed_in and timed_out:
             return 0
-        if self.timed_in != self.timed_out:
+        if timed_in != timed_out:
             return total_hours / 2
         return total_hours
 
+    def calculate_accumulated_hours(self):
+        return self.hours_for(self.event.required_hours, self.timed_in, self.timed_out)
+
     def update_hours(self):
         self.accumulated_hours = self.calculate_accumulated_hours()
 
 # ----------------- EventAttendanceHistory -----------------
 class EventAttendanceHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    attendance_id = db.Column(db.Integer, db.ForeignKey("event_attendance.id"), nullable=False)
+    attendance_id = db.Column(db.Integer, db.ForeignKey("event_attendance.id", ondelete="CASCADE"), nullable=False, index=True)
     old_hours = db.Column(db.Float, nullable=False)
     new_hours = db.Column(db.Float, nullable=False)
     changed_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     changed_at = db.Column(db.DateTime, default=datetime.utcnow)
     reason = db.Column(db.String(255))
 
-    attendance = db.relationship("EventAttendance", backref="history_logs")
+    attendance = db.relationship("EventAttendance", backref=db.backref("history_logs", passive_deletes=True))
     user = db.relationship("User")
 
     def __repr__(self):
         return f"<AttendanceHistory att={self.attendance_id} old={self.old_hours} new={self.new_hours}>"
+
+# ----------------- AttendanceScan -----------------
+class AttendanceScan(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=False)  # generated by the scanner
+    device_id = db.Column(db.String(64), nullable=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id", ondelete="CASCADE"), nullable=False, index=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("student.id", ondelete="CASCADE"), nullable=False, index=True)
+    action = db.Column(db.String(10), nullable=False)          # time_in / time_out
+    scanned_at = db.Column(db.DateTime, nullable=False)        # device clock
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AttendanceScan {self.idempotency_key} {self.action}>"
@@ -0,0 +1,45 @@
+"""Read-only row projections for the listing pages.
+
+These select only the columns the templates print, with the related
+columns joined in up front, and return plain SQLAlchemy ``Row`` tuples
+instead of ORM entities: nothing is added to the identity map and no
+relationship can lazy-load while the page renders. Use the ORM models
+for anything that writes.
+"""
+from models import db, User, AcademicYear, Semester, YearLevel, Student, Event
+
+
+def user_rows():
+    return db.session.query(User.id, User.username, User.role, User.status, User.created_at)
+
+
+def year_level_rows():
+    return (
+        db.session.query(YearLevel.id, YearLevel.level, YearLevel.section, YearLevel.academic_year_id)
+        .join(AcademicYear, YearLevel.academic_year_id == AcademicYear.id)
+        .filter(AcademicYear.deleted_at.is_(None))
+    )
+
+
+def student_rows():
+    return (
+        db.session.query(
+            Student.id, Student.student_id, Student.fname, Student.mname, Student.lname,
+            Student.status, Student.year_level_id, YearLevel.academic_year_id
+        )
+        .join(YearLevel, Student.year_level_id == YearLevel.id)
+        .join(AcademicYear, YearLevel.academic_year_id == AcademicYear.id)
+        .filter(AcademicYear.deleted_at.is_(None))
+    )
+
+
+def event_rows():
+    return (
+        db.session.query(
+            Event.id, Event.name, Event.date, Event.target_years, Event.required_hours,
+            Semester.name.label("semester_name"), AcademicYear.year.label("academic_year")
+        )
+        .join(Semester, Event.semester_id == Semester.id, isouter=True)
+        .join(AcademicYear, Semester.academic_year_id == AcademicYear.id, isouter=True)
+        .filter(Event.deleted_at.is_(None), AcademicYear.deleted_at.is_(None))
+    )
@@ -0,0 +1,129 @@
+"""Read-only reporting snapshot of the live SQLite database.
+
+Exports and history views read from a copy of ``dbcs.db`` taken with
+SQLite's online backup API, so long report queries never hold locks on
+the database officers are writing to. A background thread in each worker
+refreshes the copy once it is older than ``REPORTING_SNAPSHOT_INTERVAL``
+seconds (``flask refresh-snapshot`` does the same from cron); requests only
+copy inline when there is no snapshot yet. Each refresh is written to a
+temporary file and renamed over the snapshot, so workers refreshing at the
+same time never write into the file others are reading. The snapshot is
+opened read-only through the ``reporting`` bind.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, g
+from sqlalchemy.orm import Session
+from models import db
+
+_lock = threading.Lock()
+_refresher = None   # (pid, thread) of this process's background refresher
+
+
+def sqlite_path(engine):
+    database = engine.url.database
+    return database[5:] if engine.url.query.get("uri") else database
+
+
+def snapshot_enabled():
+    return bool(current_app.config["REPORTING_SNAPSHOT_INTERVAL"]) and db.engine.dialect.name == "sqlite"
+
+
+def snapshot_as_of():
+    """When the snapshot was last refreshed, or None if there is none yet."""
+    path = sqlite_path(db.engines["reporting"])
+    if not os.path.exists(path):
+        return None
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def refresh_snapshot():
+    """Copy the live database into the snapshot file and return its timestamp."""
+    path = sqlite_path(db.engines["reporting"])
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(fd)
+    started = time.time()
+    try:
+        source = sqlite3.connect(sqlite_path(db.engine))
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target)
+            # Read-only connections cannot open a WAL database without its -shm file
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+            source.close()
+        # The data is as of when the copy started
+        os.utime(temp_path, (started, started))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return snapshot_as_of()
+
+
+def _refresh_loop(app):
+    with app.app_context():
+        interval = app.config["REPORTING_SNAPSHOT_INTERVAL"]
+        while True:
+            as_of = snapshot_as_of()
+            age = (datetime.now() - as_of).total_seconds() if as_of else interval
+            if age >= interval:
+                try:
+                    refresh_snapshot()
+                except Exception:
+                    app.logger.exception("Reporting snapshot refresh failed")
+                age = 0
+            # Jitter so workers started together don't all copy at once;
+            # whoever wakes later sees the fresh copy and goes back to sleep
+            time.sleep(max(interval - age, 1) * random.uniform(1, 1.1))
+
+
+def start_refresher():
+    """Start this process's background refresher if it isn't running yet.
+
+    Started on first use rather than in ``create_app`` because threads do not
+    survive gunicorn forking workers from a preloaded app.
+    """
+    global _refresher
+    with _lock:
+        if _refresher is not None and _refresher[0] == os.getpid() and _refresher[1].is_alive():
+            return
+        thread = threading.Thread(
+            target=_refresh_loop, args=(current_app._get_current_object(),),
+            name="reporting-snapshot", daemon=True
+        )
+        thread.start()
+        _refresher = (os.getpid(), thread)
+
+
+def reporting_session():
+    """Return ``(session, as_of)`` for report queries.
+
+    The session reads the snapshot and is closed at the end of the request.
+    ``as_of`` is None when snapshots are disabled and the live session is
+    returned instead.
+    """
+    if not snapshot_enabled():
+        return db.session, None
+
+    if "reporting_session" not in g:
+        start_refresher()
+        as_of = snapshot_as_of()
+        if as_of is None:
+            as_of = refresh_snapshot()
+        g.reporting_session = Session(bind=db.engines["reporting"])
+        g.reporting_as_of = as_of
+    return g.reporting_session, g.reporting_as_of
+
+
+def close_reporting_session(exc=None):
+    session = g.pop("reporting_session", None)
+    if session is not None:
+        session.close()
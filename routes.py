@@ -1,16 +1,79 @@
-from flask import render_template, request, redirect, url_for, flash, session
-from datetime import datetime,timedelta
+from flask import (
+    Blueprint, abort, current_app, render_template, request, redirect, url_for, flash, session, jsonify,
+    stream_with_context
+)
+from markupsafe import Markup
+from datetime import datetime,timedelta, timezone
+from sqlalchemy import delete
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.exc import IntegrityError, OperationalError
+from projections import user_rows, year_level_rows, student_rows, event_rows
+from attendance import (
+    save_attendance_changes, apply_scans, write_recomputed_hours, run_with_retry, is_lock_error,
+    notify_attendance_changed
+)
+from transcripts import get_transcript
+from live import open_stream, changes_since
+from reporting import reporting_session
+from archive import ArchiveError, archive_academic_year, archive_session, remove_archive
 from werkzeug.security import generate_password_hash, check_password_hash
-from app import app, db
 from models import (
+    db,
     User, AcademicYear, Semester, YearLevel, Student,
-    Event, EventAttendance, EventAttendanceHistory
+    Event, EventAttendance, EventAttendanceHistory, AttendanceScan
 )
 import csv
 from io import StringIO      # <--- required
 from flask import Response, request
+
+bp = Blueprint("main", __name__)
+
+
+# -------------------- Soft-delete visibility --------------------
+# Listing queries go through these so soft-deleted academic years and
+# events (and everything under them) disappear until restored.
+def _live_academic_years():
+    # Archived years have nothing left in the live database to pick from
+    return AcademicYear.query.filter(AcademicYear.deleted_at.is_(None), AcademicYear.archive_file.is_(None))
+
+
+def _live_year_levels():
+    return YearLevel.query.join(AcademicYear).filter(AcademicYear.deleted_at.is_(None))
+
+
+def _live_students():
+    return (
+        Student.query.join(YearLevel).join(AcademicYear)
+        .filter(AcademicYear.deleted_at.is_(None))
+    )
+
+
+def _live_events():
+    return (
+        Event.query.join(Semester, isouter=True).join(AcademicYear, isouter=True)
+        .filter(Event.deleted_at.is_(None), AcademicYear.deleted_at.is_(None))
+    )
+
+
+def _live_event_or_404(event_id):
+    # Deleted events can't be opened or written by URL until they are restored
+    return _live_events().filter(Event.id == event_id).first_or_404()
+
+
+def _live_semester_for(date):
+    return (
+        Semester.query.join(AcademicYear)
+        .filter(
+            AcademicYear.deleted_at.is_(None),
+            AcademicYear.archive_file.is_(None),  # semesters kept live for an archived year's events
+            Semester.start_date <= date,
+            Semester.end_date >= date
+        ).first()
+    )
+
+
 # -------------------- Authentication --------------------
-@app.route("/", methods=["GET", "POST"])
+@bp.route("/", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         username = request.form.get("username")
@@ -19,30 +82,30 @@ def login():
         if user and check_password_hash(user.password, password):
             if user.status != "active":
                 flash("User is inactive.")
-                return redirect(url_for("login"))
+                return redirect(url_for("main.login"))
             session['user_id'] = user.id
             session['username'] = user.username
             session['role'] = user.role
-            return redirect(url_for("dashboard"))
+            return redirect(url_for("main.dashboard"))
         flash("Invalid username or password.")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
     return render_template("login.html")
 
 
-@app.route("/dashboard")
+@bp.route("/dashboard")
 def dashboard():
     if 'user_id' not in session:
         flash("Please login first.")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     # Total students (active only)
-    total_students = Student.query.filter_by(status='active').count()
+    total_students = _live_students().filter(Student.status == 'active').count()
 
     # Total events
-    total_events = Event.query.count()
+    total_events = _live_events().count()
 
     # Upcoming events (future only)
-    upcoming_events = Event.query.filter(Event.date >= datetime.now()).order_by(Event.date).all()
+    upcoming_events = _live_events().filter(Event.date >= datetime.now()).order_by(Event.date).all()
 
     # Recent attendance changes (last 7 days)
     one_week_ago = datetime.now() - timedelta(days=7)
@@ -62,29 +125,29 @@ def dashboard():
     )
 
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     session.clear()
     flash("Logged out successfully.")
-    return redirect(url_for("login"))
+    return redirect(url_for("main.login"))
 
 # -------------------- Users CRUD --------------------
-@app.route("/users")
+@bp.route("/users")
 def users():
     if 'user_id' not in session:
         flash("Please login first.", "error")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     # Restrict access to admin only
     if session.get('role') != 'admin':
         flash("You do not have permission to access this page.", "error")
-        return redirect(url_for("dashboard"))
+        return redirect(url_for("main.dashboard"))
 
     search = request.args.get("search", "").strip()
     role_filter = request.args.get("role", "")
     status_filter = request.args.get("status", "")
 
-    query = User.query
+    query = user_rows()
     if search:
         query = query.filter(User.username.like(f"%{search}%"))
     if role_filter:
@@ -99,7 +162,7 @@ def users():
                            status_filter=status_filter)
 
 
-@app.route("/users/add", methods=["POST"])
+@bp.route("/users/add", methods=["POST"])
 def add_user():
     username = request.form.get("username")
     password = request.form.get("password")
@@ -108,7 +171,7 @@ def add_user():
 
     if User.query.filter_by(username=username).first():
         flash("Username already exists.")
-        return redirect(url_for("users"))
+        return redirect(url_for("main.users"))
 
     user = User(username=username,
                 password=generate_password_hash(password),
@@ -117,13 +180,13 @@ def add_user():
     db.session.add(user)
     db.session.commit()
     flash("User added successfully.")
-    return redirect(url_for("users"))
+    return redirect(url_for("main.users"))
 
-@app.route('/edit_user/<int:user_id>', methods=['POST'])
+@bp.route('/edit_user/<int:user_id>', methods=['POST'])
 def edit_user(user_id):
     if session.get('role') != 'admin':
         flash('Unauthorized access.', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
 
     user = User.query.get_or_404(user_id)
 
@@ -141,30 +204,35 @@ def edit_user(user_id):
 
     db.session.commit()
     flash('User updated successfully.', 'success')
-    return redirect(url_for('users'))
+    return redirect(url_for('main.users'))
 
 
 
-@app.route("/users/delete/<int:user_id>")
+@bp.route("/users/delete/<int:user_id>")
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        flash("User has attendance changes on record and cannot be deleted; set them inactive instead.")
+        return redirect(url_for("main.users"))
     flash("User deleted successfully.")
-    return redirect(url_for("users"))
+    return redirect(url_for("main.users"))
 
 
 # -------------------- Academic Years --------------------
-@app.route("/academic_years")
+@bp.route("/academic_years")
 def academic_years():
     if 'user_id' not in session:
         flash("Please login first.")
-        return redirect(url_for("login"))
-    years = AcademicYear.query.order_by(AcademicYear.id.desc()).all()
+        return redirect(url_for("main.login"))
+    years = AcademicYear.query.filter(AcademicYear.deleted_at.is_(None)).order_by(AcademicYear.id.desc()).all()
     return render_template("academic_years.html", years=years)
 
 
-@app.route("/academic_years/add", methods=["POST"])
+@bp.route("/academic_years/add", methods=["POST"])
 def add_academic_year():
     year = request.form.get("year")
     status = request.form.get("status", "active")
@@ -175,7 +243,7 @@ def add_academic_year():
 
     if AcademicYear.query.filter_by(year=year).first():
         flash("Academic year already exists")
-        return redirect(url_for("academic_years"))
+        return redirect(url_for("main.academic_years"))
 
     ay = AcademicYear(year=year, status=status)
     db.session.add(ay)
@@ -196,12 +264,15 @@ def add_academic_year():
     db.session.add_all([sem1, sem2])
     db.session.commit()
     flash("Academic year added successfully")
-    return redirect(url_for("academic_years"))
+    return redirect(url_for("main.academic_years"))
 
 
-@app.route("/academic_years/edit/<int:ay_id>", methods=["POST"])
+@bp.route("/academic_years/edit/<int:ay_id>", methods=["POST"])
 def edit_academic_year(ay_id):
     ay = AcademicYear.query.get_or_404(ay_id)
+    if ay.archive_file:
+        flash("Archived academic years are read-only")
+        return redirect(url_for("main.academic_years"))
     ay.year = request.form.get("year")
     ay.status = request.form.get("status", "active")
 
@@ -219,24 +290,105 @@ def edit_academic_year(ay_id):
 
     db.session.commit()
     flash("Academic year updated successfully")
-    return redirect(url_for("academic_years"))
+    return redirect(url_for("main.academic_years"))
 
 
-@app.route("/academic_years/delete/<int:ay_id>")
+@bp.route("/academic_years/delete/<int:ay_id>")
 def delete_academic_year(ay_id):
     ay = AcademicYear.query.get_or_404(ay_id)
-    db.session.delete(ay)
+
+    if current_app.config["SOFT_DELETE"]:
+        ay.deleted_at = datetime.utcnow()
+        db.session.commit()
+        notify_attendance_changed()
+        undo_url = url_for("main.restore_academic_year", ay_id=ay.id)
+        flash(Markup('Academic year deleted. <a href="{}">Undo</a>').format(undo_url))
+        return redirect(url_for("main.academic_years"))
+
+    # Semesters, year levels, students and their attendance go with it via ON DELETE CASCADE
+    archive_file = ay.archive_file
+    db.session.execute(delete(AcademicYear).where(AcademicYear.id == ay.id))
     db.session.commit()
+    if archive_file:
+        remove_archive(archive_file)
+    notify_attendance_changed()
     flash("Academic year deleted successfully")
-    return redirect(url_for("academic_years"))
+    return redirect(url_for("main.academic_years"))
+
+
+@bp.route("/academic_years/restore/<int:ay_id>")
+def restore_academic_year(ay_id):
+    ay = AcademicYear.query.get_or_404(ay_id)
+    ay.deleted_at = None
+    db.session.commit()
+    notify_attendance_changed()
+    flash("Academic year restored successfully")
+    return redirect(url_for("main.academic_years"))
+
+
+@bp.route("/academic_years/archive/<int:ay_id>", methods=["POST"])
+def archive_academic_year_route(ay_id):
+    if 'user_id' not in session:
+        flash("Please login first.")
+        return redirect(url_for("main.login"))
+    if session.get('role') != 'admin':
+        flash("Only administrators can archive academic years.", "error")
+        return redirect(url_for("main.academic_years"))
+
+    ay = AcademicYear.query.get_or_404(ay_id)
+    try:
+        archive_academic_year(ay)
+    except ArchiveError as e:
+        flash(str(e))
+        return redirect(url_for("main.academic_years"))
+    notify_attendance_changed()
+    flash("Academic year archived successfully")
+    return redirect(url_for("main.academic_years"))
+
+
+@bp.route("/academic_years/<int:ay_id>/archive")
+def archived_academic_year(ay_id):
+    if 'user_id' not in session:
+        flash("Please login first.")
+        return redirect(url_for("main.login"))
+
+    ay = AcademicYear.query.get_or_404(ay_id)
+    if not ay.archive_file:
+        return redirect(url_for("main.academic_years"))
+
+    archive = archive_session(ay)
+    try:
+        events = (
+            archive.query(Event.id, Event.name, Event.date, Event.required_hours, Semester.name.label("semester_name"))
+            .join(Semester, Event.semester_id == Semester.id)
+            .order_by(Event.date)
+            .all()
+        )
+        students = (
+            archive.query(
+                Student.student_id, Student.fname, Student.mname, Student.lname, Student.status,
+                YearLevel.level, YearLevel.section,
+                db.func.coalesce(db.func.sum(EventAttendance.accumulated_hours), 0).label("total_hours"),
+                db.func.count(EventAttendance.id).label("event_count")
+            )
+            .join(YearLevel, Student.year_level_id == YearLevel.id)
+            .outerjoin(EventAttendance, EventAttendance.student_id == Student.id)
+            .group_by(Student.id)
+            .order_by(Student.lname, Student.fname)
+            .all()
+        )
+    finally:
+        archive.close()
+
+    return render_template("archived_year.html", ay=ay, events=events, students=students)
 
 
 # -------------------- Year Levels --------------------
-@app.route("/year_levels")
+@bp.route("/year_levels")
 def year_levels():
     search = request.args.get("search", "").strip()
     ay_filter = request.args.get("academic_year", "")
-    query = YearLevel.query.join(AcademicYear)
+    query = year_level_rows()
     if search:
         query = query.filter(
             (db.cast(YearLevel.level, db.String).like(f"%{search}%")) |
@@ -245,12 +397,12 @@ def year_levels():
     if ay_filter:
         query = query.filter(YearLevel.academic_year_id == int(ay_filter))
     year_levels_list = query.order_by(YearLevel.level, YearLevel.section).all()
-    academic_years = AcademicYear.query.order_by(AcademicYear.year.desc()).all()
+    academic_years = _live_academic_years().order_by(AcademicYear.year.desc()).all()
     return render_template("year_levels.html", year_levels=year_levels_list, academic_years=academic_years,
                            search=search, ay_filter=ay_filter)
 
 
-@app.route("/year_levels/add", methods=["POST"])
+@bp.route("/year_levels/add", methods=["POST"])
 def add_year_level():
     level = int(request.form.get("level"))
     section = request.form.get("section")
@@ -258,16 +410,16 @@ def add_year_level():
 
     if YearLevel.query.filter_by(level=level, section=section, academic_year_id=academic_year_id).first():
         flash("Year level + section already exists for this academic year.")
-        return redirect(url_for("year_levels"))
+        return redirect(url_for("main.year_levels"))
 
     yl = YearLevel(level=level, section=section, academic_year_id=academic_year_id)
     db.session.add(yl)
     db.session.commit()
     flash("Year level added successfully.")
-    return redirect(url_for("year_levels"))
+    return redirect(url_for("main.year_levels"))
 
 
-@app.route("/year_levels/edit/<int:yl_id>", methods=["POST"])
+@bp.route("/year_levels/edit/<int:yl_id>", methods=["POST"])
 def edit_year_level(yl_id):
     yl = YearLevel.query.get_or_404(yl_id)
     yl.level = int(request.form.get("level"))
@@ -275,35 +427,35 @@ def edit_year_level(yl_id):
     yl.academic_year_id = int(request.form.get("academic_year"))
     db.session.commit()
     flash("Year level updated successfully.")
-    return redirect(url_for("year_levels"))
+    return redirect(url_for("main.year_levels"))
 
 
-@app.route("/year_levels/delete/<int:yl_id>")
+@bp.route("/year_levels/delete/<int:yl_id>")
 def delete_year_level(yl_id):
     yl = YearLevel.query.get_or_404(yl_id)
     db.session.delete(yl)
     db.session.commit()
     flash("Year level deleted successfully.")
-    return redirect(url_for("year_levels"))
+    return redirect(url_for("main.year_levels"))
 
 # -------------------- Students --------------------
-@app.route("/students")
+@bp.route("/students")
 def students():
     if 'user_id' not in session:
         flash("Please login first.", "error")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     # Restrict access to admin only
     if session.get('role') != 'admin':
         flash("You do not have permission to access this page.", "error")
-        return redirect(url_for("dashboard"))
+        return redirect(url_for("main.dashboard"))
 
     search = request.args.get("search", "").strip()
     status_filter = request.args.get("status", "")
     ay_filter = request.args.get("academic_year", "")
     yl_filter = request.args.get("year_level", "")
 
-    query = Student.query.join(YearLevel).join(AcademicYear)
+    query = student_rows()
 
     if search:
         query = query.filter(
@@ -319,15 +471,15 @@ def students():
         query = query.filter(YearLevel.academic_year_id == int(ay_filter))
 
     students_list = query.order_by(Student.student_id).all()
-    academic_years = AcademicYear.query.order_by(AcademicYear.year.desc()).all()
-    year_levels = YearLevel.query.order_by(YearLevel.level, YearLevel.section).all()
+    academic_years = _live_academic_years().order_by(AcademicYear.year.desc()).all()
+    year_levels = year_level_rows().order_by(YearLevel.level, YearLevel.section).all()
     
     return render_template("students.html", students=students_list, academic_years=academic_years,
                            year_levels=year_levels, search=search, status_filter=status_filter,
                            ay_filter=ay_filter, yl_filter=yl_filter)
 
 
-@app.route("/students/add", methods=["POST"])
+@bp.route("/students/add", methods=["POST"])
 def add_student():
     student_id = request.form.get("student_id")
     fname = request.form.get("fname")
@@ -338,17 +490,17 @@ def add_student():
 
     if Student.query.filter_by(student_id=student_id).first():
         flash("Student ID already exists.")
-        return redirect(url_for("students"))
+        return redirect(url_for("main.students"))
 
     student = Student(student_id=student_id, fname=fname, mname=mname, lname=lname,
                       year_level_id=year_level_id, status=status)
     db.session.add(student)
     db.session.commit()
     flash("Student added successfully.")
-    return redirect(url_for("students"))
+    return redirect(url_for("main.students"))
 
 
-@app.route("/students/edit/<int:student_id>", methods=["POST"])
+@bp.route("/students/edit/<int:student_id>", methods=["POST"])
 def edit_student(student_id):
     student = Student.query.get_or_404(student_id)
     student.student_id = request.form.get("student_id")
@@ -358,27 +510,29 @@ def edit_student(student_id):
     student.year_level_id = int(request.form.get("year_level"))
     student.status = request.form.get("status")
     db.session.commit()
+    notify_attendance_changed([student.id])
     flash("Student updated successfully.")
-    return redirect(url_for("students"))
+    return redirect(url_for("main.students"))
 
 
-@app.route("/students/delete/<int:student_id>")
+@bp.route("/students/delete/<int:student_id>")
 def delete_student(student_id):
     student = Student.query.get_or_404(student_id)
     db.session.delete(student)
     db.session.commit()
+    notify_attendance_changed([student_id])
     flash("Student deleted successfully.")
-    return redirect(url_for("students"))
+    return redirect(url_for("main.students"))
 
 
 # -------------------- Events --------------------
-@app.route("/events")
+@bp.route("/events")
 def events():
     search = request.args.get("search", "").strip()
     ay_filter = request.args.get("academic_year")
     sem_filter = request.args.get("semester")
 
-    query = Event.query.join(Semester, isouter=True).join(AcademicYear, isouter=True)
+    query = event_rows()
 
     if search:
         query = query.filter(Event.name.ilike(f"%{search}%"))
@@ -388,12 +542,12 @@ def events():
         query = query.filter(Semester.name == sem_filter)
 
     events_list = query.order_by(Event.date.desc()).all()
-    year_levels = YearLevel.query.order_by(YearLevel.level, YearLevel.section).all()
-    academic_years = AcademicYear.query.order_by(AcademicYear.year.desc()).all()
+    year_levels = year_level_rows().order_by(YearLevel.level, YearLevel.section).all()
+    academic_years = _live_academic_years().order_by(AcademicYear.year.desc()).all()
     return render_template("events.html", events=events_list, year_levels=year_levels, academic_years=academic_years)
 
 
-@app.route("/events/add", methods=["POST"])
+@bp.route("/events/add", methods=["POST"])
 def add_event():
     name = request.form.get("name")
     date_str = request.form.get("date")
@@ -402,15 +556,12 @@ def add_event():
 
     if not date_str:
         flash("Date is required.")
-        return redirect(url_for("events"))
+        return redirect(url_for("main.events"))
 
     date = datetime.strptime(date_str, "%Y-%m-%d").date()
 
     # Find matching semester
-    semester = Semester.query.filter(
-        Semester.start_date <= date,
-        Semester.end_date >= date
-    ).first()
+    semester = _live_semester_for(date)
     semester_id = semester.id if semester else None
 
     # Convert selected year levels to comma-separated string
@@ -428,9 +579,9 @@ def add_event():
 
     # Bind students to event
     if "all" in selected_year_levels:
-        students = Student.query.filter_by(status="active").all()
+        students = _live_students().filter(Student.status == "active").all()
     else:
-        students = Student.query.filter(
+        students = _live_students().filter(
             Student.status == "active",
             Student.year_level_id.in_([int(yl) for yl in selected_year_levels])
         ).all()
@@ -444,15 +595,20 @@ def add_event():
         db.session.add(attendance)
 
     db.session.commit()
+    notify_attendance_changed([student.id for student in students], [event.id])
     flash("Event created successfully with semester auto-detected.")
-    return redirect(url_for("events"))
+    return redirect(url_for("main.events"))
 
 # -------------------- Edit Event --------------------
-@app.route("/events/edit/<int:event_id>", methods=["GET", "POST"])
+@bp.route("/events/edit/<int:event_id>", methods=["GET", "POST"])
 def edit_event(event_id):
-    event = Event.query.get_or_404(event_id)
-    year_levels = YearLevel.query.order_by(YearLevel.level, YearLevel.section).all()
-    academic_years = AcademicYear.query.order_by(AcademicYear.year.desc()).all()
+    if 'user_id' not in session:
+        flash("Please login first.")
+        return redirect(url_for("main.login"))
+
+    event = _live_event_or_404(event_id)
+    year_levels = _live_year_levels().order_by(YearLevel.level, YearLevel.section).all()
+    academic_years = _live_academic_years().order_by(AcademicYear.year.desc()).all()
 
     if request.method == "POST":
         name = request.form.get("name")
@@ -460,20 +616,31 @@ def edit_event(event_id):
         required_hours = float(request.form.get("required_hours", 2.0))
         selected_year_levels = request.form.getlist("target_years")
 
-        event.name = name
-        event.date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        event.required_hours = required_hours
-        event.target_years = "all" if "all" in selected_year_levels else ",".join(selected_year_levels)
-
-        semester = Semester.query.filter(
-            Semester.start_date <= event.date,
-            Semester.end_date >= event.date
-        ).first()
-        event.semester_id = semester.id if semester else None
-
-        db.session.commit()
+        event_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        semester = _live_semester_for(event_date)
+
+        def apply_edit():
+            # The new hours and the totals recomputed from them commit together
+            hours_changed = event.required_hours != required_hours
+            event.name = name
+            event.date = event_date
+            event.required_hours = required_hours
+            event.target_years = "all" if "all" in selected_year_levels else ",".join(selected_year_levels)
+            event.semester_id = semester.id if semester else None
+            db.session.flush()
+            if hours_changed:
+                write_recomputed_hours(session['user_id'], [event.id], reason="Event required hours changed")
+
+        try:
+            run_with_retry(apply_edit)
+        except OperationalError as e:
+            if not is_lock_error(e):
+                raise
+            flash("The database is busy and the event was not saved. Please try again.")
+            return redirect(url_for("main.edit_event", event_id=event.id))
+        notify_attendance_changed(event_ids=[event.id])
         flash("Event updated successfully.")
-        return redirect(url_for("events"))
+        return redirect(url_for("main.events"))
 
     return render_template(
         "edit_event.html",
@@ -484,48 +651,293 @@ def edit_event(event_id):
 
 
 # -------------------- Delete Event --------------------
-@app.route("/events/delete/<int:event_id>")
+@bp.route("/events/delete/<int:event_id>")
 def delete_event(event_id):
     event = Event.query.get_or_404(event_id)
-    # Delete associated attendance records first
-    EventAttendance.query.filter_by(event_id=event.id).delete()
-    db.session.delete(event)
+
+    if current_app.config["SOFT_DELETE"]:
+        event.deleted_at = datetime.utcnow()
+        db.session.commit()
+        notify_attendance_changed(event_ids=[event.id])
+        undo_url = url_for("main.restore_event", event_id=event.id)
+        flash(Markup('Event deleted. <a href="{}">Undo</a>').format(undo_url))
+        return redirect(url_for("main.events"))
+
+    # Attendance records and their history go with it via ON DELETE CASCADE
+    db.session.execute(delete(Event).where(Event.id == event.id))
     db.session.commit()
+    notify_attendance_changed(event_ids=[event_id])
     flash("Event deleted successfully.")
-    return redirect(url_for("events"))
+    return redirect(url_for("main.events"))
+
+
+@bp.route("/events/restore/<int:event_id>")
+def restore_event(event_id):
+    event = Event.query.get_or_404(event_id)
+    event.deleted_at = None
+    db.session.commit()
+    notify_attendance_changed(event_ids=[event.id])
+    flash("Event restored successfully.")
+    return redirect(url_for("main.events"))
 
 
 # -------------------- Event Attendance --------------------
-@app.route("/events/<int:event_id>/attendance")
+def _submitted_attendance(attendance_ids, in_prefix, out_prefix):
+    """Collect (id, version, timed_in, timed_out) for the rows present on the submitted form."""
+    changes = []
+    for attendance_id in attendance_ids:
+        version = request.form.get(f"version_{attendance_id}", type=int)
+        if version is None:
+            continue
+        changes.append((
+            attendance_id,
+            version,
+            bool(request.form.get(f"{in_prefix}{attendance_id}")),
+            bool(request.form.get(f"{out_prefix}{attendance_id}"))
+        ))
+    return changes
+
+
+def _conflict_message(conflicts, with_event=False, shown=10):
+    """Flash text naming the students whose rows were not saved because of a conflict."""
+    rows = (
+        db.session.query(Student.student_id, Student.fname, Student.lname, Event.name)
+        .join(EventAttendance, EventAttendance.student_id == Student.id)
+        .join(Event, EventAttendance.event_id == Event.id)
+        .filter(EventAttendance.id.in_(conflicts[:shown]))
+        .order_by(Student.lname, Student.fname, Event.date)
+        .all()
+    )
+    names = [
+        f"{fname} {lname} ({student_id}{', ' + event_name if with_event else ''})"
+        for student_id, fname, lname, event_name in rows
+    ]
+    if len(conflicts) > shown:
+        names.append(f"and {len(conflicts) - shown} more")
+    return (f"{len(conflicts)} record(s) were changed by someone else while you were editing and were not "
+            f"saved: {'; '.join(names)}. Review them and save again.")
+
+
+@bp.route("/events/<int:event_id>/attendance")
 def event_attendance(event_id):
-    event = Event.query.get_or_404(event_id)
+    event = _live_event_or_404(event_id)
     attendances = EventAttendance.query.filter_by(event_id=event_id).join(Student).order_by(Student.student_id).all()
     return render_template("event_attendance.html", event=event, attendances=attendances)
 
 
-@app.route("/events/<int:event_id>/attendance/save", methods=["POST"])
+@bp.route("/events/<int:event_id>/attendance/save", methods=["POST"])
 def save_event_attendance(event_id):
-    event = Event.query.get_or_404(event_id)
-    attendances = EventAttendance.query.filter_by(event_id=event_id).all()
+    event = _live_event_or_404(event_id)
+    attendance_ids = [
+        attendance_id for (attendance_id,) in
+        db.session.query(EventAttendance.id).filter_by(event_id=event.id)
+    ]
 
-    for attendance in attendances:
-        attendance.timed_in = bool(request.form.get(f"timed_in_{attendance.id}"))
-        attendance.timed_out = bool(request.form.get(f"timed_out_{attendance.id}"))
-        attendance.update_hours()  # Ensure this method exists
+    changes = _submitted_attendance(attendance_ids, "timed_in_", "timed_out_")
+    _, conflicts = save_attendance_changes(changes, session.get('user_id'))
+
+    if conflicts:
+        flash(_conflict_message(conflicts))
+    else:
+        flash("Attendance saved successfully.")
+    return redirect(url_for("main.event_attendance", event_id=event_id))
 
-    db.session.commit()
-    flash("Attendance saved successfully.")
-    return redirect(url_for("event_attendance", event_id=event_id))
+
+@bp.route("/events/<int:event_id>/attendance/stream")
+def event_attendance_stream(event_id):
+    if 'user_id' not in session:
+        return jsonify(error="Please login first."), 401
+
+    _live_event_or_404(event_id)
+    # Streams stay open for as long as the page does; don't pin a pooled connection to each one
+    db.session.close()
+    stream = open_stream(event_id, request.headers.get("Last-Event-ID"), current_app.config['LIVE_MAX_STREAMS'])
+    if stream is None:
+        # Each stream holds a worker thread; past the cap the page polls the changes route instead
+        return jsonify(error="Too many live streams on this server."), 503
+    return Response(
+        stream_with_context(stream),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@bp.route("/events/<int:event_id>/attendance/changes")
+def event_attendance_changes(event_id):
+    if 'user_id' not in session:
+        return jsonify(error="Please login first."), 401
+
+    _live_event_or_404(event_id)
+    return Response(
+        changes_since(event_id, request.args.get("cursor")),
+        mimetype="application/json",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+# -------------------- Attendance Ingestion API --------------------
+SCAN_ACTIONS = ("time_in", "time_out")
+MAX_SCAN_BATCH = 10000
+IN_CHUNK_SIZE = 500  # keep IN (...) lists under SQLite's bound-parameter limit
+
+
+def _chunks(items, size=IN_CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _parse_scan(record):
+    """Validate one uploaded scan; returns (key, event_id, student_code, action, scanned_at)."""
+    if not isinstance(record, dict) or not record.get("key"):
+        raise ValueError("missing key")
+    key = str(record["key"])
+    if len(key) > 64:
+        raise ValueError("key longer than 64 characters")
+    try:
+        event_id = int(record.get("event_id"))
+    except (TypeError, ValueError):
+        raise ValueError("invalid event_id")
+    student_code = record.get("student_id")
+    if not student_code:
+        raise ValueError("missing student_id")
+    action = record.get("action")
+    if action not in SCAN_ACTIONS:
+        raise ValueError("action must be time_in or time_out")
+    try:
+        scanned_at = datetime.fromisoformat(str(record.get("scanned_at")))
+    except ValueError:
+        raise ValueError("invalid scanned_at")
+    if scanned_at.tzinfo:
+        scanned_at = scanned_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return key, event_id, str(student_code), action, scanned_at
+
+
+@bp.route("/api/attendance/scans", methods=["POST"])
+def ingest_attendance_scans():
+    """Apply a batch of buffered scanner records in one transaction.
+
+    Each record is ``{"key", "event_id", "student_id", "action", "scanned_at"}``
+    where ``key`` is the scanner's idempotency key, so re-uploading a batch
+    after a dropped connection is harmless.
+    """
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify(error="Please login first."), 401
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error="Request body must be a JSON object."), 400
+    records = payload.get("records")
+    if not isinstance(records, list):
+        return jsonify(error="'records' must be a list."), 400
+    if len(records) > MAX_SCAN_BATCH:
+        return jsonify(error=f"At most {MAX_SCAN_BATCH} records per request."), 413
+    device_id = payload.get("device_id")
+
+    results = [None] * len(records)
+    pending = []
+    seen_keys = set()
+    for i, record in enumerate(records):
+        try:
+            key, event_id, student_code, action, scanned_at = _parse_scan(record)
+        except ValueError as e:
+            key = record.get("key") if isinstance(record, dict) else None
+            results[i] = {"key": key, "status": "rejected", "error": str(e)}
+            continue
+        if key in seen_keys:
+            results[i] = {"key": key, "status": "duplicate"}
+            continue
+        seen_keys.add(key)
+        pending.append((i, key, event_id, student_code, action, scanned_at))
+
+    # Drop keys applied by an earlier upload
+    applied_keys = set()
+    for chunk in _chunks(seen_keys):
+        applied_keys.update(
+            key for (key,) in db.session.query(AttendanceScan.idempotency_key)
+            .filter(AttendanceScan.idempotency_key.in_(chunk))
+        )
+    fresh = []
+    for scan in pending:
+        if scan[1] in applied_keys:
+            results[scan[0]] = {"key": scan[1], "status": "duplicate"}
+        else:
+            fresh.append(scan)
+
+    # Resolve student numbers and the attendance rows they touch; soft-deleted
+    # events and students of soft-deleted years take no scans until restored
+    student_pks = {}
+    for chunk in _chunks({scan[3] for scan in fresh}):
+        student_pks.update(
+            _live_students().with_entities(Student.student_id, Student.id).filter(Student.student_id.in_(chunk))
+        )
+    event_ids = set()
+    for chunk in _chunks({scan[2] for scan in fresh}):
+        event_ids.update(
+            event_id for (event_id,) in _live_events().with_entities(Event.id).filter(Event.id.in_(chunk))
+        )
+    attendance_ids = {}
+    for chunk in _chunks(set(student_pks.values())):
+        query = (
+            db.session.query(EventAttendance.id, EventAttendance.event_id, EventAttendance.student_id)
+            .filter(EventAttendance.event_id.in_(event_ids), EventAttendance.student_id.in_(chunk))
+        )
+        for row in query:
+            attendance_ids[(row.event_id, row.student_id)] = row.id
+
+    # Scans only ever set flags, so the order they are applied in doesn't matter
+    scan_rows = []
+    marks = {}
+    for i, key, event_id, student_code, action, scanned_at in fresh:
+        student_pk = student_pks.get(student_code)
+        attendance_id = attendance_ids.get((event_id, student_pk))
+        if attendance_id is None:
+            if event_id not in event_ids:
+                error = "unknown event"
+            elif student_pk is None:
+                error = "unknown student"
+            else:
+                error = "student not registered for event"
+            results[i] = {"key": key, "status": "rejected", "error": error}
+            continue
+        time_in, time_out = marks.get(attendance_id, (False, False))
+        marks[attendance_id] = (time_in or action == "time_in", time_out or action == "time_out")
+        scan_rows.append({
+            "idempotency_key": key,
+            "device_id": device_id,
+            "event_id": event_id,
+            "student_id": student_pk,
+            "action": action,
+            "scanned_at": scanned_at,
+        })
+        results[i] = {"key": key, "status": "applied"}
+
+    reason = f"Scanner upload ({device_id})" if device_id else "Scanner upload"
+    try:
+        apply_scans(marks, scan_rows, user_id, reason)
+    except IntegrityError:
+        # Another upload applied some of these keys concurrently; a retry will dedupe them.
+        db.session.rollback()
+        return jsonify(error="Conflicting upload in progress, retry the batch."), 409
+    except OperationalError as e:
+        if not is_lock_error(e):
+            raise
+        return jsonify(error="Database is busy, retry the batch."), 503
+
+    counts = {"applied": 0, "duplicate": 0, "rejected": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return jsonify(counts=counts, results=results)
 
 # -------------------- Attendance Dashboard --------------------
-@app.route("/attendance_dashboard")
+@bp.route("/attendance_dashboard")
 def attendance_dashboard():
     # Get filter params
     selected_ay_id = request.args.get("academic_year", type=int)
     selected_sem_id = request.args.get("semester", type=int)
 
     # Academic years, ordered descending
-    academic_years = AcademicYear.query.order_by(AcademicYear.year.desc()).all()
+    academic_years = _live_academic_years().order_by(AcademicYear.year.desc()).all()
 
     # Default: latest academic year
     if not selected_ay_id and academic_years:
@@ -544,6 +956,7 @@ def attendance_dashboard():
     if current_ay:
         students = (
             Student.query.join(YearLevel)
+            .options(contains_eager(Student.year_level))
             .filter(Student.status == "active", YearLevel.academic_year_id == current_ay.id)
             .order_by(Student.lname, Student.fname, Student.mname)
             .all()
@@ -560,17 +973,47 @@ def attendance_dashboard():
     # Events filtered by semester if selected, otherwise all semesters in that AY
     if current_ay:
         if current_semester:
-            events = Event.query.filter_by(semester_id=current_semester.id).order_by(Event.date).all()
+            events = Event.query.filter(
+                Event.semester_id == current_semester.id, Event.deleted_at.is_(None)
+            ).order_by(Event.date).all()
         else:
             sem_ids = [sem.id for sem in semesters]
-            events = Event.query.filter(Event.semester_id.in_(sem_ids)).order_by(Event.date).all()
+            events = Event.query.filter(
+                Event.semester_id.in_(sem_ids), Event.deleted_at.is_(None)
+            ).order_by(Event.date).all()
     else:
         events = []
 
+    # Index attendance per student up front so each table cell is a dict lookup
+    # instead of a selectattr/map/sum chain over student.event_attendances.
+    attendance_by_student = {}
+    semester_ids_by_student = {}
+    hours_by_student = {}
+    if current_ay:
+        attendance_rows = (
+            db.session.query(
+                EventAttendance.id, EventAttendance.student_id, EventAttendance.event_id,
+                EventAttendance.timed_in, EventAttendance.timed_out,
+                EventAttendance.accumulated_hours, EventAttendance.version, Event.semester_id
+            )
+            .join(Event, EventAttendance.event_id == Event.id)
+            .join(Student, EventAttendance.student_id == Student.id)
+            .join(YearLevel, Student.year_level_id == YearLevel.id)
+            .filter(
+                Student.status == "active",
+                YearLevel.academic_year_id == current_ay.id,
+                Event.deleted_at.is_(None)
+            )
+        )
+        for att in attendance_rows:
+            attendance_by_student.setdefault(att.student_id, {})[att.event_id] = att
+            semester_ids_by_student.setdefault(att.student_id, []).append(att.semester_id)
+            hours_by_student[att.student_id] = hours_by_student.get(att.student_id, 0) + (att.accumulated_hours or 0)
+
     # Calculate total accumulated hours for all active students
     total_hours = sum(
         student.total_hours_override if getattr(student, "total_hours_override", None) is not None
-        else sum(att.accumulated_hours for att in student.event_attendances)
+        else hours_by_student.get(student.id, 0)
         for student in students
     )
 
@@ -583,46 +1026,29 @@ def attendance_dashboard():
         semesters=semesters,
         selected_ay_id=selected_ay_id,
         selected_sem_id=selected_sem_id,
+        attendance_by_student=attendance_by_student,
+        semester_ids_by_student=semester_ids_by_student,
+        hours_by_student=hours_by_student,
         total_hours=total_hours  # pass to template
     )
 
 
-@app.route("/attendance_dashboard/save", methods=["POST"])
+@bp.route("/attendance_dashboard/save", methods=["POST"])
 def save_all_attendance():
     user_id = session.get('user_id')
     if not user_id:
         flash("Please login first.", "error")
-        return redirect(url_for("login"))
-
-    # Update each event attendance
-    for attendance in EventAttendance.query.all():
-        old_hours = attendance.accumulated_hours
-        event_hours = attendance.event.required_hours
-
-        # Update timed_in and timed_out from form
-        timed_in = bool(request.form.get(f"timein_{attendance.id}"))
-        timed_out = bool(request.form.get(f"timeout_{attendance.id}"))
-        attendance.timed_in = timed_in
-        attendance.timed_out = timed_out
-
-        # Recalculate hours based on checkboxes
-        if timed_in and timed_out:
-            new_hours = 0
-        elif timed_in or timed_out:
-            new_hours = max(event_hours / 2, 0)
-        else:
-            new_hours = max(event_hours, 0)
-
-        if old_hours != new_hours:
-            attendance.accumulated_hours = new_hours
-            history = EventAttendanceHistory(
-                attendance_id=attendance.id,
-                old_hours=old_hours,
-                new_hours=new_hours,
-                changed_by=user_id,
-                reason="Manual adjustment via attendance dashboard"
-            )
-            db.session.add(history)
+        return redirect(url_for("main.login"))
+
+    # Update the event attendances shown on the submitted form
+    attendance_ids = [
+        int(key[len("version_"):]) for key in request.form
+        if key.startswith("version_") and key[len("version_"):].isdigit()
+    ]
+    changes = _submitted_attendance(attendance_ids, "timein_", "timeout_")
+    _, conflicts = save_attendance_changes(
+        changes, user_id, reason="Manual adjustment via attendance dashboard"
+    )
 
     # Update editable Total CS Hours per student
     students = Student.query.join(YearLevel).filter(Student.status=="active").all()
@@ -636,12 +1062,15 @@ def save_all_attendance():
             student.total_hours_override = total_cs
 
     db.session.commit()
-    flash("Attendance and total CS hours saved successfully.", "success")
-    return redirect(url_for("attendance_dashboard"))
+    if conflicts:
+        flash(_conflict_message(conflicts, with_event=True), "error")
+    else:
+        flash("Attendance and total CS hours saved successfully.", "success")
+    return redirect(url_for("main.attendance_dashboard"))
 
 
 
-@app.route("/export_attendance")
+@bp.route("/export_attendance")
 def export_attendance():
     # Get filters from query parameters
     name_filter = request.args.get("name", "").lower()
@@ -650,9 +1079,10 @@ def export_attendance():
     year_level_filter = request.args.get("year_level")
     event_filter = request.args.get("event")
 
-    # Query all students and events (replace with filtered queries if needed)
-    students = Student.query.all()
-    events = Event.query.all()
+    # Query all students and events from the reporting snapshot
+    report_session, as_of = reporting_session()
+    students = _live_students().with_session(report_session).all()
+    events = _live_events().with_session(report_session).all()
 
     # Optional: apply filtering here
     if name_filter:
@@ -695,21 +1125,30 @@ def export_attendance():
         writer.writerow(row)
 
     output = si.getvalue()
+    # The snapshot time goes in the filename, where whoever opens the export sees it
+    filename = f"attendance_as_of_{as_of:%Y-%m-%d_%H%M}.csv" if as_of else "attendance.csv"
+    headers = {"Content-Disposition": f"attachment;filename={filename}"}
+    if as_of:
+        headers["X-Data-As-Of"] = as_of.isoformat(timespec="seconds")
     return Response(
         output,
         mimetype="text/csv",
-        headers={"Content-Disposition": "attachment;filename=attendance.csv"}
+        headers=headers
     )
 # -------------------- Attendance History --------------------
-@app.route("/attendance_history")
+@bp.route("/attendance_history")
 def attendance_history():
     if 'user_id' not in session:
         flash("Please login first.")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     # Optional time filter
     time_filter = request.args.get("time", "all")  # all, today, week, month
-    query = EventAttendanceHistory.query.join(User, EventAttendanceHistory.changed_by == User.id)
+    report_session, as_of = reporting_session()
+    query = (
+        EventAttendanceHistory.query.with_session(report_session)
+        .join(User, EventAttendanceHistory.changed_by == User.id)
+    )
 
     now = datetime.now()
     if time_filter == "today":
@@ -721,11 +1160,11 @@ def attendance_history():
 
     logs = query.order_by(EventAttendanceHistory.changed_at.desc()).all()
 
-    return render_template("attendance_history.html", logs=logs)
+    return render_template("attendance_history.html", logs=logs, as_of=as_of)
 
 
 # -------------------- Student Promotion --------------------
-@app.route("/students/promote/<int:student_id>")
+@bp.route("/students/promote/<int:student_id>")
 def promote_student(student_id):
     student = Student.query.get_or_404(student_id)
     current_yl = student.year_level
@@ -744,8 +1183,9 @@ def promote_student(student_id):
     if next_level > 4:
         student.status = "graduate"
         db.session.commit()
+        notify_attendance_changed([student.id])
         flash(f"{student.fname} {student.lname} has graduated.")
-        return redirect(url_for("students"))
+        return redirect(url_for("main.students"))
 
     next_yl = YearLevel.query.filter_by(
         academic_year_id=next_ay.id,
@@ -759,7 +1199,30 @@ def promote_student(student_id):
 
     student.year_level_id = next_yl.id
     db.session.commit()
+    notify_attendance_changed([student.id])
     flash(f"{student.fname} {student.lname} promoted to {next_level}-{next_yl.section} ({next_ay.year})")
-    return redirect(url_for("students"))
+    return redirect(url_for("main.students"))
+
 
+# -------------------- Student Transcript --------------------
+@bp.route("/students/<int:student_id>/transcript")
+def student_transcript(student_id):
+    if 'user_id' not in session:
+        flash("Please login first.")
+        return redirect(url_for("main.login"))
+
+    transcript = get_transcript(student_id)
+    if transcript is None:
+        abort(404)
+    return render_template("transcript.html", transcript=transcript)
+
+
+@bp.route("/api/students/<int:student_id>/transcript")
+def student_transcript_json(student_id):
+    if 'user_id' not in session:
+        return jsonify(error="Please login first."), 401
 
+    transcript = get_transcript(student_id)
+    if transcript is None:
+        return jsonify(error="Student not found."), 404
+    return jsonify(transcript)
@@ -0,0 +1,112 @@
+"""End-to-end check that archiving a year leaves live students' records alone.
+
+Builds a closed year with a student who graduated and one who was promoted
+into the current year, both with attendance at the closed year's events,
+archives it in a throwaway database and checks that:
+- every live student's transcript total is the same before and after;
+- the graduated student's rows moved into the archive, and the promoted
+  student's rows (and the event they point at) stayed live.
+
+    python scripts/archive_check.py
+"""
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from archive import archive_academic_year
+from attendance import save_attendance_changes
+from commands import init_db
+from models import db, User, AcademicYear, Semester, YearLevel, Student, Event, EventAttendance
+from transcripts import build_transcript
+
+
+def seed():
+    admin_id = User.query.filter_by(username="admin").first().id
+    closed = AcademicYear(year="2024-2025", status="inactive")
+    current = AcademicYear(year="2025-2026")
+    db.session.add_all([closed, current])
+    db.session.flush()
+    old_semester = Semester(academic_year_id=closed.id, name="1st Semester",
+                            start_date=date(2024, 6, 1), end_date=date(2024, 10, 30))
+    new_semester = Semester(academic_year_id=current.id, name="1st Semester",
+                            start_date=date(2025, 6, 1), end_date=date(2025, 10, 30))
+    old_level = YearLevel(level=1, section="A", academic_year_id=closed.id)
+    new_level = YearLevel(level=2, section="A", academic_year_id=current.id)
+    db.session.add_all([old_semester, new_semester, old_level, new_level])
+    db.session.flush()
+    graduated = Student(student_id="G0000001", fname="Grace", lname="Graduated", year_level_id=old_level.id)
+    promoted = Student(student_id="P0000001", fname="Paul", lname="Promoted", year_level_id=old_level.id)
+    old_event = Event(name="Cleanup 2024", date=date(2024, 7, 1), required_hours=4,
+                      target_years="all", semester_id=old_semester.id)
+    new_event = Event(name="Cleanup 2025", date=date(2025, 7, 1), required_hours=4,
+                      target_years="all", semester_id=new_semester.id)
+    db.session.add_all([graduated, promoted, old_event, new_event])
+    db.session.flush()
+    attendances = [
+        EventAttendance(event_id=old_event.id, student_id=graduated.id, accumulated_hours=4),
+        EventAttendance(event_id=old_event.id, student_id=promoted.id, accumulated_hours=4),
+    ]
+    db.session.add_all(attendances)
+    db.session.commit()
+
+    # Attend the closed year's event, then move on to the current year
+    save_attendance_changes([(a.id, a.version, True, False) for a in attendances], admin_id, reason="Check")
+    promoted.year_level_id = new_level.id
+    db.session.add(EventAttendance(event_id=new_event.id, student_id=promoted.id, accumulated_hours=4))
+    db.session.commit()
+    return closed.id, graduated.id, promoted.id, old_event.id
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="archive-check-")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'archive-check.db')}"})
+    app.instance_path = workdir  # keep the archive file out of the real instance folder
+    with app.app_context():
+        init_db()
+        closed_id, graduated_id, promoted_id, old_event_id = seed()
+
+        live_students = [
+            student_pk for (student_pk,) in
+            db.session.query(Student.id).join(YearLevel).filter(YearLevel.academic_year_id != closed_id)
+        ]
+        before = {pk: build_transcript(pk)["total_hours"] for pk in live_students}
+        path = archive_academic_year(db.session.get(AcademicYear, closed_id))
+        after = {pk: build_transcript(pk)["total_hours"] for pk in live_students}
+
+        problems = []
+        if before != after:
+            problems.append(f"live totals changed: before={before} after={after}")
+        if db.session.get(Student, graduated_id) is not None:
+            problems.append("graduated student is still in the live database")
+        if db.session.get(Event, old_event_id) is None:
+            problems.append("event attended by a live student was removed from the live database")
+        if not EventAttendance.query.filter_by(student_id=promoted_id, event_id=old_event_id).count():
+            problems.append("promoted student's attendance at the archived year was removed")
+
+        expanded = os.path.join(workdir, "expanded.db")
+        with gzip.open(path, "rb") as src, open(expanded, "wb") as dst:
+            dst.write(src.read())
+        archive = sqlite3.connect(expanded)
+        archived_rows = archive.execute(
+            "SELECT count(*) FROM event_attendance WHERE student_id = ?", (graduated_id,)
+        ).fetchone()[0]
+        archive.close()
+        if archived_rows != 1:
+            problems.append(f"expected the graduated student's row in the archive, found {archived_rows}")
+
+    print(f"live totals before={before} after={after}")
+    if problems:
+        print("FAILED: " + "; ".join(problems))
+        return 1
+    print("archive kept live students' records")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
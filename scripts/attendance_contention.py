@@ -0,0 +1,141 @@
+"""Multi-threaded contention test for attendance saves and scanner uploads.
+
+Runs officers' compare-and-swap saves and scanner uploads against a small set
+of hot attendance rows in a throwaway SQLite database, then checks that no
+update was lost: every row's ``version`` must equal 1 plus the number of
+writes reported as applied to it, and every applied write must have left a
+history entry. Prints save latency percentiles.
+
+    python scripts/attendance_contention.py --threads 8 --seconds 10
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from attendance import apply_scans, save_attendance_changes
+from commands import init_db
+from models import (
+    db, User, AcademicYear, Semester, YearLevel, Student, Event, EventAttendance, EventAttendanceHistory
+)
+
+
+def seed(rows):
+    admin_id = User.query.filter_by(username="admin").first().id
+    ay = AcademicYear(year="2025-2026")
+    db.session.add(ay)
+    db.session.flush()
+    semester = Semester(academic_year_id=ay.id, name="1st Semester",
+                        start_date=date(2025, 6, 1), end_date=date(2025, 10, 30))
+    year_level = YearLevel(level=1, section="A", academic_year_id=ay.id)
+    db.session.add_all([semester, year_level])
+    db.session.flush()
+    event = Event(name="Contention", date=date(2025, 7, 1), required_hours=4,
+                  target_years="all", semester_id=semester.id)
+    students = [Student(student_id=f"C{i:05d}", fname="F", lname=f"L{i}", year_level_id=year_level.id)
+                for i in range(rows)]
+    db.session.add_all(students + [event])
+    db.session.flush()
+    attendances = [EventAttendance(event_id=event.id, student_id=s.id, accumulated_hours=4) for s in students]
+    db.session.add_all(attendances)
+    db.session.commit()
+    return admin_id, [a.id for a in attendances], {a.id: a.student_id for a in attendances}, event.id
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=20, help="hot attendance rows shared by all threads")
+    parser.add_argument("--scan-share", type=float, default=0.2, help="fraction of writes that are scans")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="contention-")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'contention.db')}"})
+    with app.app_context():
+        init_db()
+        admin_id, attendance_ids, student_of, event_id = seed(args.rows)
+
+    applied = Counter()
+    latencies = []
+    counts = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def worker():
+        local_applied = Counter()
+        local_latencies = []
+        local_counts = Counter()
+        with app.app_context():
+            while time.monotonic() < deadline:
+                attendance_id = random.choice(attendance_ids)
+                if random.random() < args.scan_share:
+                    scan = {
+                        "idempotency_key": uuid.uuid4().hex,
+                        "device_id": "contention",
+                        "event_id": event_id,
+                        "student_id": student_of[attendance_id],
+                        "action": "time_out",
+                        "scanned_at": datetime.utcnow(),
+                    }
+                    changed = apply_scans({attendance_id: (False, True)}, [scan], admin_id, "Contention scan")
+                    local_applied.update(row["id"] for row in changed)
+                    local_counts["scans"] += 1
+                    continue
+
+                # An officer renders the row, thinks a little, then saves a toggle
+                row = db.session.get(EventAttendance, attendance_id, populate_existing=True)
+                change = (attendance_id, row.version, not row.timed_in, bool(row.timed_out))
+                db.session.rollback()
+                time.sleep(random.uniform(0, 0.002))
+                started = time.perf_counter()
+                saved, conflicts = save_attendance_changes([change], admin_id, reason="Contention save")
+                local_latencies.append(time.perf_counter() - started)
+                if saved:
+                    local_applied[attendance_id] += 1
+                local_counts["saves"] += 1
+                local_counts["conflicts"] += len(conflicts)
+        with lock:
+            applied.update(local_applied)
+            latencies.extend(local_latencies)
+            counts.update(local_counts)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        versions = dict(db.session.query(EventAttendance.id, EventAttendance.version))
+        history = db.session.query(EventAttendanceHistory).count()
+    lost = {aid: (versions[aid] - 1, applied[aid]) for aid in attendance_ids if versions[aid] - 1 != applied[aid]}
+
+    print(f"threads={args.threads} rows={args.rows} seconds={args.seconds}")
+    print(f"saves={counts['saves']} conflicts={counts['conflicts']} scans={counts['scans']} "
+          f"applied={sum(applied.values())} history={history}")
+    print("save latency ms: p50={:.1f} p99={:.1f} max={:.1f}".format(
+        percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000, max(latencies, default=0) * 1000))
+    if lost or history != sum(applied.values()):
+        print(f"LOST UPDATES: {lost or 'history count mismatch'}")
+        return 1
+    print("no lost updates")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
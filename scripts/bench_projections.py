@@ -0,0 +1,120 @@
+"""Benchmark the listing projections against the ORM entities they replaced.
+
+Seeds a throwaway SQLite database with ``--rows`` students and events, then
+builds the students and events listings both ways: ORM entities plus the
+relationships the templates used to walk (``student.year_level``,
+``event.semester.academic_year``), and the ``student_rows()`` /
+``event_rows()`` projections. Reports the best wall time of ``--repeat``
+runs and the tracemalloc peak, each per 10k rows.
+
+    python scripts/bench_projections.py --rows 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from commands import init_db
+from models import db, AcademicYear, Semester, YearLevel, Student, Event
+from projections import student_rows, event_rows
+
+
+def seed(rows):
+    ay = AcademicYear(year="2025-2026")
+    db.session.add(ay)
+    db.session.flush()
+    semester = Semester(academic_year_id=ay.id, name="1st Semester",
+                        start_date=date(2025, 6, 1), end_date=date(2025, 10, 30))
+    year_levels = [YearLevel(level=level, section="A", academic_year_id=ay.id) for level in range(1, 5)]
+    db.session.add_all([semester] + year_levels)
+    db.session.flush()
+    db.session.add_all(
+        Student(student_id=f"B{i:07d}", fname=f"First{i}", mname="M", lname=f"Last{i}",
+                year_level_id=year_levels[i % len(year_levels)].id)
+        for i in range(rows)
+    )
+    db.session.add_all(
+        Event(name=f"Event {i}", date=date(2025, 6, 1) + timedelta(days=i % 150), required_hours=4,
+              target_years="all", semester_id=semester.id)
+        for i in range(rows)
+    )
+    db.session.commit()
+
+
+def orm_students():
+    students = (
+        Student.query.join(YearLevel).join(AcademicYear)
+        .filter(AcademicYear.deleted_at.is_(None))
+        .order_by(Student.student_id).all()
+    )
+    return [(s.student_id, s.lname, s.year_level.academic_year_id) for s in students]
+
+
+def projected_students():
+    return [(s.student_id, s.lname, s.academic_year_id) for s in student_rows().order_by(Student.student_id)]
+
+
+def orm_events():
+    events = (
+        Event.query.join(Semester, isouter=True).join(AcademicYear, isouter=True)
+        .filter(Event.deleted_at.is_(None), AcademicYear.deleted_at.is_(None))
+        .order_by(Event.date.desc()).all()
+    )
+    return [(e.name, e.semester.academic_year.year if e.semester else None) for e in events]
+
+
+def projected_events():
+    return [(e.name, e.academic_year) for e in event_rows().order_by(Event.date.desc())]
+
+
+def measure(build, repeat):
+    """(best seconds, tracemalloc peak bytes) for one listing build on a fresh session."""
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.remove()
+        started = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - started)
+    db.session.remove()
+    tracemalloc.start()
+    build()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.session.remove()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-projections-")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'bench.db')}"})
+    with app.app_context():
+        init_db()
+        seed(args.rows)
+        scale = 10000 / args.rows
+        print(f"rows={args.rows} repeat={args.repeat} (figures per 10k rows)")
+        for listing, orm, projected in (
+            ("students", orm_students, projected_students),
+            ("events", orm_events, projected_events),
+        ):
+            orm_time, orm_peak = measure(orm, args.repeat)
+            rows_time, rows_peak = measure(projected, args.repeat)
+            print(f"{listing:<9} orm: {orm_time * scale * 1000:7.1f} ms {orm_peak * scale / 2**20:6.1f} MB   "
+                  f"projection: {rows_time * scale * 1000:7.1f} ms {rows_peak * scale / 2**20:6.1f} MB   "
+                  f"saved: {(orm_time - rows_time) * scale * 1000:7.1f} ms "
+                  f"{(orm_peak - rows_peak) * scale / 2**20:6.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Per-template compile and render timings.
+
+For every template in ``templates/`` this prints:
+- compile time on a cold process (no bytecode cache);
+- compile time when loading from the Jinja bytecode cache that
+  ``create_app()`` installs;
+- render time on the page that uses it.
+
+The render time is taken between Flask's ``before_render_template`` and
+``template_rendered`` signals, on a throwaway database seeded with
+``--students`` students and ``--events`` events. It is the template alone,
+without the view's queries. Each figure is the best of ``--repeat`` runs.
+
+    python scripts/bench_templates.py --students 1000 --events 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import before_render_template, template_rendered
+from app import create_app
+from archive import archive_academic_year
+from commands import init_db
+from models import db, AcademicYear, Semester, YearLevel, Student, Event, EventAttendance
+
+
+def seed(students, events):
+    current = AcademicYear(year="2025-2026")
+    closed = AcademicYear(year="2024-2025", status="inactive")
+    db.session.add_all([current, closed])
+    db.session.flush()
+    semesters = [
+        Semester(academic_year_id=current.id, name="1st Semester",
+                 start_date=date(2025, 6, 1), end_date=date(2025, 10, 30)),
+        Semester(academic_year_id=current.id, name="2nd Semester",
+                 start_date=date(2025, 11, 1), end_date=date(2026, 3, 30)),
+        Semester(academic_year_id=closed.id, name="1st Semester",
+                 start_date=date(2024, 6, 1), end_date=date(2024, 10, 30)),
+    ]
+    year_levels = [YearLevel(level=level, section="A", academic_year_id=current.id) for level in range(1, 5)]
+    closed_level = YearLevel(level=4, section="A", academic_year_id=closed.id)
+    db.session.add_all(semesters + year_levels + [closed_level])
+    db.session.flush()
+
+    live_students = [
+        Student(student_id=f"T{i:07d}", fname=f"First{i}", lname=f"Last{i}",
+                year_level_id=year_levels[i % len(year_levels)].id)
+        for i in range(students)
+    ]
+    closed_students = [
+        Student(student_id=f"A{i:07d}", fname=f"First{i}", lname=f"Alumni{i}", year_level_id=closed_level.id)
+        for i in range(10)
+    ]
+    live_events = [
+        Event(name=f"Event {j}", date=date(2025, 6, 2) + timedelta(days=j * 7), required_hours=4,
+              target_years="all", semester_id=semesters[0].id)
+        for j in range(events)
+    ]
+    closed_event = Event(name="Closed year event", date=date(2024, 7, 1), required_hours=4,
+                         target_years="all", semester_id=semesters[2].id)
+    db.session.add_all(live_students + closed_students + live_events + [closed_event])
+    db.session.flush()
+    db.session.add_all(
+        EventAttendance(event_id=event.id, student_id=student.id, timed_in=(student.id + event.id) % 3 > 0,
+                        timed_out=(student.id + event.id) % 3 > 1, accumulated_hours=4)
+        for event in live_events for student in live_students
+    )
+    db.session.add_all(
+        EventAttendance(event_id=closed_event.id, student_id=student.id, accumulated_hours=4)
+        for student in closed_students
+    )
+    db.session.commit()
+    archive_academic_year(closed)
+    return closed.id, live_students[0].id, live_events[0].id
+
+
+def time_compiles(app, names, repeat):
+    env = app.jinja_env
+    timings = {}
+    for name in names:
+        best = float("inf")
+        for _ in range(repeat):
+            env.cache.clear()
+            started = time.perf_counter()
+            env.get_template(name)
+            best = min(best, time.perf_counter() - started)
+        timings[name] = best
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-templates-")
+    config = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "REPORTING_SNAPSHOT_INTERVAL": 0,
+    }
+
+    cold = create_app(dict(config, JINJA_CACHE_DIR=""))
+    names = sorted(cold.jinja_env.list_templates(extensions=["html"]))
+    cold_compile = time_compiles(cold, names, args.repeat)
+
+    app = create_app(dict(config, JINJA_CACHE_DIR=os.path.join(workdir, "jinja_cache")))
+    app.instance_path = workdir  # keep the archive file out of the real instance folder
+    for name in names:
+        app.jinja_env.get_template(name)  # fill the bytecode cache
+    cached_compile = time_compiles(app, names, args.repeat)
+
+    with app.app_context():
+        init_db()
+        closed_id, student_pk, event_id = seed(args.students, args.events)
+
+    pages = [
+        "/dashboard", "/users", "/academic_years", f"/academic_years/{closed_id}/archive", "/year_levels",
+        "/students", "/events", f"/events/edit/{event_id}", f"/events/{event_id}/attendance",
+        "/attendance_dashboard", "/attendance_history", f"/students/{student_pk}/transcript",
+    ]
+    renders = {}
+    started = {}
+
+    def before(sender, template, context, **extra):
+        started[template.name] = time.perf_counter()
+
+    def after(sender, template, context, **extra):
+        elapsed = time.perf_counter() - started.pop(template.name)
+        renders[template.name] = min(renders.get(template.name, float("inf")), elapsed)
+
+    before_render_template.connect(before, app)
+    template_rendered.connect(after, app)
+    anonymous = app.test_client()
+    client = app.test_client()
+    client.post("/", data={"username": "admin", "password": "admin123"})
+    for _ in range(args.repeat):
+        anonymous.get("/")
+        for page in pages:
+            response = client.get(page)
+            if response.status_code != 200:
+                print(f"{page} returned {response.status_code}")
+                return 1
+
+    print(f"students={args.students} events={args.events} repeat={args.repeat} (best, ms)")
+    print(f"{'template':<28}{'compile cold':>14}{'compile cached':>16}{'render':>10}")
+    for name in names:
+        render = f"{renders[name] * 1000:10.2f}" if name in renders else f"{'-':>10}"
+        print(f"{name:<28}{cold_compile[name] * 1000:14.2f}{cached_compile[name] * 1000:16.2f}{render}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,19 @@
 document.addEventListener("DOMContentLoaded", () => {
     const checkboxes = document.querySelectorAll('input[type="checkbox"]');
-    
+
     // Add visual feedback when checkboxes change
     checkboxes.forEach(checkbox => {
         checkbox.addEventListener('change', function() {
             const row = this.closest('tr');
+            row.dataset.dirty = '1';
             row.style.background = '#f0f9ff';
-            
+
             setTimeout(() => {
                 row.style.background = '';
             }, 1000);
         });
     });
-    
+
     // Form submission feedback
     const form = document.querySelector('form');
     if (form) {
@@ -24,4 +25,91 @@ document.addEventListener("DOMContentLoaded", () => {
             }
         });
     }
-});
\ No newline at end of file
+
+    // Live counts and rows pushed by the server as attendance is saved
+    const liveCounts = document.querySelector('.live-counts');
+    if (!liveCounts) {
+        return;
+    }
+    const table = document.querySelector('.event-attendance-table');
+    const POLL_INTERVAL_MS = 5000;
+    let cursor = null;
+
+    function showCounts(counts) {
+        liveCounts.querySelector('[data-count="timed_in"]').textContent = counts.timed_in;
+        liveCounts.querySelector('[data-count="timed_out"]').textContent = counts.timed_out;
+    }
+
+    function showRow(change) {
+        const row = table.querySelector(`tr[data-attendance-id="${change.id}"]`);
+        // Leave rows the user is editing alone; saving them reports the conflict
+        if (!row || row.dataset.dirty) {
+            return;
+        }
+        const version = row.querySelector(`input[name="version_${change.id}"]`);
+        if (change.version <= parseInt(version.value, 10)) {
+            return;
+        }
+        row.querySelector(`input[name="timed_in_${change.id}"]`).checked = change.timed_in;
+        row.querySelector(`input[name="timed_out_${change.id}"]`).checked = change.timed_out;
+        version.value = change.version;
+
+        // The pushed hours are recomputed on the server, so they follow edits to
+        // the event's required hours that the rendered page doesn't know about
+        const hours = change.hours ?? 0;
+        const badge = row.querySelector('.hours-badge');
+        badge.classList.remove('completed', 'partial', 'pending');
+        if (change.timed_in && change.timed_out) {
+            badge.classList.add('completed');
+            badge.textContent = hours;
+        } else if (change.timed_in || change.timed_out) {
+            badge.classList.add('partial');
+            badge.textContent = hours.toFixed(1);
+        } else {
+            badge.classList.add('pending');
+            badge.textContent = hours;
+        }
+
+        row.style.background = '#f0fdf4';
+        setTimeout(() => {
+            row.style.background = '';
+        }, 1000);
+    }
+
+    function showChanges(data) {
+        showCounts(data.counts);
+        data.rows.forEach(showRow);
+    }
+
+    function poll() {
+        const url = liveCounts.dataset.changesUrl + (cursor ? `?cursor=${encodeURIComponent(cursor)}` : '');
+        fetch(url, { credentials: 'same-origin' })
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (data) {
+                    cursor = data.cursor;
+                    data.messages.forEach(showChanges);
+                }
+            })
+            .catch(() => {})
+            .finally(() => setTimeout(poll, POLL_INTERVAL_MS));
+    }
+
+    if (!window.EventSource) {
+        poll();
+        return;
+    }
+    const stream = new EventSource(liveCounts.dataset.streamUrl);
+    ['snapshot', 'attendance'].forEach(name => {
+        stream.addEventListener(name, e => {
+            cursor = e.lastEventId;
+            showChanges(JSON.parse(e.data));
+        });
+    });
+    // The server refuses streams past its per-worker limit; poll for changes instead
+    stream.addEventListener('error', () => {
+        if (stream.readyState === EventSource.CLOSED) {
+            poll();
+        }
+    });
+});
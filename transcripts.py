@@ -0,0 +1,162 @@
+"""Per-student service transcripts, built with one query and cached in-process.
+
+Entries are dropped when ``attendance_changed`` names the student (or is
+sent without a student list). Writes made by other worker processes are not
+signalled here, so every cached entry also carries a watermark of the
+student's attendance rows and of the soft-deleted events and years, checked
+with one query before the entry is served. Event and student details that no attendance write touches (a
+renamed event, for one) are picked up within ``TRANSCRIPT_CACHE_TTL`` seconds.
+"""
+import threading
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from models import (
+    db, User, AcademicYear, Semester, YearLevel, Student,
+    Event, EventAttendance, EventAttendanceHistory
+)
+from attendance import attendance_changed
+
+TRANSCRIPT_CACHE_TTL = 300  # seconds
+
+_cache = {}                 # student pk -> (expires_at, watermark, transcript)
+_generation = 0             # bumped on every invalidation
+_lock = threading.Lock()
+
+
+def build_transcript(student_pk):
+    """Return the transcript dict for a student, or None if there is no such student."""
+    student_ay = aliased(AcademicYear)
+    event_ay = aliased(AcademicYear)
+    rows = (
+        db.session.query(
+            Student.id, Student.student_id, Student.fname, Student.mname, Student.lname, Student.status,
+            YearLevel.level, YearLevel.section, student_ay.year.label("student_year"),
+            EventAttendance.id.label("attendance_id"), EventAttendance.timed_in, EventAttendance.timed_out,
+            EventAttendance.accumulated_hours,
+            Event.id.label("event_id"), Event.name.label("event_name"), Event.date.label("event_date"),
+            Event.required_hours, Semester.name.label("semester_name"), event_ay.year.label("event_year"),
+            event_ay.deleted_at.label("event_year_deleted_at"),
+            EventAttendanceHistory.old_hours, EventAttendanceHistory.new_hours,
+            EventAttendanceHistory.changed_at, EventAttendanceHistory.reason, User.username.label("changed_by")
+        )
+        .join(YearLevel, Student.year_level_id == YearLevel.id)
+        .join(student_ay, YearLevel.academic_year_id == student_ay.id)
+        .outerjoin(EventAttendance, EventAttendance.student_id == Student.id)
+        .outerjoin(Event, (EventAttendance.event_id == Event.id) & Event.deleted_at.is_(None))
+        .outerjoin(Semester, Event.semester_id == Semester.id)
+        .outerjoin(event_ay, Semester.academic_year_id == event_ay.id)
+        .outerjoin(EventAttendanceHistory, EventAttendanceHistory.attendance_id == EventAttendance.id)
+        .outerjoin(User, EventAttendanceHistory.changed_by == User.id)
+        .filter(Student.id == student_pk, student_ay.deleted_at.is_(None))
+        .order_by(Event.date, Event.id, EventAttendanceHistory.changed_at)
+        .all()
+    )
+    if not rows:
+        return None
+
+    first = rows[0]
+    entries = {}
+    for row in rows:
+        if row.event_id is None or row.event_year_deleted_at is not None:
+            continue  # soft-deleted event, or an event of a soft-deleted year
+        entry = entries.get(row.attendance_id)
+        if entry is None:
+            entry = entries[row.attendance_id] = {
+                "event_id": row.event_id,
+                "event": row.event_name,
+                "date": row.event_date.isoformat(),
+                "semester": row.semester_name,
+                "academic_year": row.event_year,
+                "required_hours": row.required_hours,
+                "timed_in": bool(row.timed_in),
+                "timed_out": bool(row.timed_out),
+                "hours": row.accumulated_hours or 0,
+                "history": [],
+            }
+        if row.changed_at is not None:
+            entry["history"].append({
+                "changed_at": row.changed_at.isoformat(timespec="minutes"),
+                "old_hours": row.old_hours,
+                "new_hours": row.new_hours,
+                "changed_by": row.changed_by,
+                "reason": row.reason,
+            })
+
+    events = list(entries.values())
+    return {
+        "student": {
+            "id": first.id,
+            "student_id": first.student_id,
+            "name": " ".join(part for part in (first.fname, first.mname, first.lname) if part),
+            "year_level": f"{first.level}-{first.section}",
+            "academic_year": first.student_year,
+            "status": first.status,
+        },
+        "total_hours": round(sum(event["hours"] for event in events), 2),
+        "events": events,
+    }
+
+
+def attendance_watermark(student_pk):
+    """Row count, version sum and latest history id of a student's attendance,
+    plus how many events and academic years are soft-deleted.
+
+    Every attendance write bumps ``version``, so this changes whenever any
+    process writes for the student; the deleted counts change when any
+    process deletes or restores what the transcript would show.
+    """
+    history_attendance = aliased(EventAttendance)
+    latest_history = (
+        select(func.max(EventAttendanceHistory.id))
+        .join(history_attendance, EventAttendanceHistory.attendance_id == history_attendance.id)
+        .where(history_attendance.student_id == student_pk)
+        .scalar_subquery()
+    )
+    deleted_events = select(func.count(Event.id)).where(Event.deleted_at.isnot(None)).scalar_subquery()
+    deleted_years = (
+        select(func.count(AcademicYear.id)).where(AcademicYear.deleted_at.isnot(None)).scalar_subquery()
+    )
+    return tuple(
+        db.session.query(
+            func.count(EventAttendance.id),
+            func.coalesce(func.sum(EventAttendance.version), 0),
+            latest_history,
+            deleted_events,
+            deleted_years
+        )
+        .filter(EventAttendance.student_id == student_pk)
+        .one()
+    )
+
+
+def get_transcript(student_pk):
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(student_pk)
+        generation = _generation
+    # Read before building, so a write that lands meanwhile leaves a stale
+    # watermark behind and the next request rebuilds
+    watermark = attendance_watermark(student_pk)
+    if cached and cached[0] > now and cached[1] == watermark:
+        return cached[2]
+
+    transcript = build_transcript(student_pk)
+    with _lock:
+        # Skip caching if a write landed while the transcript was being built
+        if transcript is not None and generation == _generation:
+            _cache[student_pk] = (now + TRANSCRIPT_CACHE_TTL, watermark, transcript)
+    return transcript
+
+
+@attendance_changed.connect
+def _invalidate(sender, student_ids=None, **kwargs):
+    global _generation
+    with _lock:
+        _generation += 1
+        if student_ids is None:
+            _cache.clear()
+        else:
+            for student_pk in student_ids:
+                _cache.pop(student_pk, None)